@@ -17,6 +17,8 @@ class Node:
 class Void:
     latest_id = 0
     void = []
+    # Pipe of every node holding a byte per buffered datum, so that nodes can wait for data with select
+    pipes = []
     lock = _thread.allocate_lock()
     links = None
 
@@ -26,6 +28,7 @@ class Void:
     def init_node(self):
         new_id = self.latest_id
         self.void.append(RingBuffer(10))
+        self.pipes.append(os.pipe())
 
         self.latest_id += 1
 
@@ -39,12 +42,13 @@ class Void:
             node_links = self.links[node_id]
 
         for i, buffer in enumerate(self.void):
-            if i == node_id:
+            if (i == node_id) or (buffer is None):
                 continue
             elif node_links and (i not in node_links):
                 continue
 
             buffer.push(deepcopy(data))
+            os.write(self.pipes[i][1], b"\x00")
 
         self.lock.release()
 
@@ -54,6 +58,7 @@ class Void:
 
         try:
             data = self.void[node_id].pop()
+            os.read(self.pipes[node_id][0], 1)
         except RingBufferUnderflow:
             pass
         finally:
@@ -61,6 +66,22 @@ class Void:
 
         return data
 
+    def fileno(self, node_id):
+        return self.pipes[node_id][0]
+
+    def remove_node(self, node_id):
+        self.lock.acquire()
+
+        if self.pipes[node_id] is not None:
+            read_fd, write_fd = self.pipes[node_id]
+            os.close(read_fd)
+            os.close(write_fd)
+
+        self.void[node_id] = None
+        self.pipes[node_id] = None
+
+        self.lock.release()
+
 
 class LoRa:
     LORA = "LoRa"
@@ -88,11 +109,49 @@ class socket:
         self.blocking = flag
 
     def send(self, data):
-        self.void.send(data, self.node_id)
+        # Data may be a memoryview of a send buffer, copy it before it is reused
+        self.void.send(bytes(data), self.node_id)
 
     def recv(self, buffer_size):
         return self.void.recv(self.node_id)
 
+    def fileno(self):
+        return self.void.fileno(self.node_id)
+
+    def close(self):
+        self.void.remove_node(self.node_id)
+
+
+class Timer:
+    class Alarm:
+        """
+        Stand-in for machine.Timer.Alarm running on the timer service shared by all simulated nodes, so that alarms
+        do not take a thread each. handler is called with arg, or with the alarm if arg is None.
+        """
+
+        def __init__(self, handler=None, s=None, ms=None, us=None, arg=None, periodic=False):
+            # Imported here, cuttlefish imports adapter when machine is not available
+            from cuttlefish.scheduler.timer import get_timer_service
+
+            self.handler = handler
+            self.arg = arg
+
+            if s is None:
+                s = (ms / 1000) if ms is not None else (us / 1000000)
+
+            self.handle = get_timer_service().schedule(s, self.fire, periodic=periodic)
+
+        def fire(self):
+            if self.handler:
+                self.handler(self.arg if self.arg is not None else self)
+
+        def callback(self, handler, arg=None):
+            self.handler = handler
+            self.arg = arg
+
+        def cancel(self):
+            self.handle.cancel()
+
 
 class RTC:
     def init(self, datetime=None):
@@ -1,4 +1,6 @@
-import _thread
+from .adapter import Timer
+
+import select
 import time
 
 
@@ -10,32 +12,21 @@ def asynchronous_schedule_sim(
     uplink_downlink_interval=1,
     **kwargs
 ):
-    cancel_flag = False
-
-    _thread.start_new_thread(
-        alarm, (uplink_interval, cancel_flag, scheduler.uplink, [scheduler, channel_id, kwargs])
-    )
-    time.sleep(uplink_downlink_interval)
-    _thread.start_new_thread(
-        alarm,
-        (
-            downlink_interval,
-            cancel_flag,
-            scheduler.downlink,
-            [scheduler, kwargs],
-        ),
-    )
+    uplink_alarm = Timer.Alarm(scheduler.uplink, uplink_interval, periodic=True, arg=(scheduler, channel_id, kwargs))
 
-    return cancel_flag
+    # Sockets registered with a reactor are received from as soon as data arrives
+    if scheduler.reactor:
+        return uplink_alarm, None
 
+    # Imported here, cuttlefish imports adapter when machine is not available
+    from cuttlefish.scheduler.timer import get_timer_service
 
-def alarm(interval, cancel_flag, callback, arg):
-    while True:
-        if cancel_flag:
-            break
+    # Downlink is offset from uplink by a timer instead of blocking the caller
+    downlink_alarm = get_timer_service().schedule(
+        uplink_downlink_interval, scheduler.downlink, (scheduler, kwargs), periodic=True, interval=downlink_interval
+    )
 
-        time.sleep(interval)
-        callback(arg)
+    return uplink_alarm, downlink_alarm
 
 
 def implicitly_synchronous_schedule_sim(scheduler, channel_id, receive_delay=0.00003, window_length=2, **kwargs):
@@ -49,11 +40,11 @@ def implicitly_synchronous_schedule_sim(scheduler, channel_id, receive_delay=0.0
 
         time_0 = time.time()
 
-        result = recv_window(time_0, window_length, scheduler.downlink, (scheduler, kwargs))
+        result = recv_window(time_0, window_length, scheduler.downlink, (scheduler, kwargs, channel_id))
 
         if not result:
             time_0 = time.time()
-            recv_window(time_0, window_length, scheduler.downlink, (scheduler, kwargs))
+            recv_window(time_0, window_length, scheduler.downlink, (scheduler, kwargs, channel_id))
 
     return initiate_transmission_window, None
 
@@ -61,10 +52,15 @@ def implicitly_synchronous_schedule_sim(scheduler, channel_id, receive_delay=0.0
 def recv_window(time_0, window_length, downlink, arg):
     result = False
 
+    socket = arg[0].socket
+
     while (time.time() - time_0) < window_length:
         result = downlink(arg)
 
         if result:
             return result
 
+        # Sleep until more data arrives or the window closes
+        select.select([socket], [], [], max(window_length - (time.time() - time_0), 0))
+
     return result
@@ -1,11 +1,10 @@
 from cuttlefish.network_primitives.network import Network
 from cuttlefish.packet_management import attr, INT
+from cuttlefish.scheduler.reactor import start_listening
+from .adapter import Timer
 
 from random import random
-import time
 
-import _thread
-import threading
 import copy
 
 
@@ -57,7 +56,6 @@ class NetworkFloodingSim(Network):
         self.interval_alarm = None
         self.transmit_alarm = None
 
-        self.cancel_flag = threading.Event()
         self.uplink_arg = None
         self.downlink_arg = None
 
@@ -115,7 +113,7 @@ class NetworkFloodingSim(Network):
             self.reset_interval()
 
     def disconnect(self):
-        self.cancel_flag.set()
+        self.cancel_alarms()
 
     def get_flagged_attributes(self, data):
         attributes = []
@@ -151,11 +149,6 @@ class NetworkFloodingSim(Network):
             self.default_data.append([self.version_id])
 
     def scheduler_callback(self, *args, **kwargs):
-        def listen():
-            while True:
-                scheduler.downlink(self.downlink_arg)
-                time.sleep(0.01)
-
         scheduler = args[0]
         args = list(args)
         args.append(kwargs)
@@ -165,7 +158,7 @@ class NetworkFloodingSim(Network):
 
         self.start_interval()
 
-        _thread.start_new_thread(listen, tuple())
+        start_listening(scheduler, self.downlink_arg)
 
     def start_interval(self):
         delta_i = self.I_MAX - self.I_MIN
@@ -184,7 +177,7 @@ class NetworkFloodingSim(Network):
         self.reset_primitives()
 
     def reset_interval(self):
-        self.cancel_flag.set()
+        self.cancel_alarms()
 
         self.interval_length = self.I_MIN
 
@@ -195,7 +188,6 @@ class NetworkFloodingSim(Network):
         self.transmit_time = half_interval + (half_interval * random())
 
         self.counter = 0
-        self.cancel_flag.clear()
 
         self.transmit_alarm = self.set_alarm(self.uplink, self.transmit_time, periodic=False, debug="transmit")
         self.interval_alarm = self.set_alarm(self.restart_interval, self.interval_length, periodic=False, debug="interval")
@@ -208,18 +200,9 @@ class NetworkFloodingSim(Network):
             scheduler.uplink(self.uplink_arg)
 
     def set_alarm(self, callback, interval, periodic=False, debug=None):
-        def alarm():
-            time_0 = time.time()
-
-            while (time.time() - time_0) < interval:
-                if self.cancel_flag.isSet():
-                    return
-
-                time.sleep(0.01)
-
-            callback()
-
-        alarm_thread = _thread.start_new_thread(alarm, tuple())
-
-        return alarm_thread
+        return Timer.Alarm(lambda alarm: callback(), interval, periodic=periodic)
 
+    def cancel_alarms(self):
+        for alarm in (self.transmit_alarm, self.interval_alarm):
+            if alarm:
+                alarm.cancel()
@@ -0,0 +1,50 @@
+"""
+Run benchmarks and print results as JSON.
+
+    python -m benchmarks [--filter NAME ...] [--output FILE] [--baseline FILE] [--threshold RATIO]
+
+If a baseline (a file previously written with --output) is given, benchmarks slower than baseline by more than
+threshold are reported and the process exits with status 1.
+"""
+from . import channel, ring_buffer, serializer
+from .runner import Runner, compare, dump, load
+
+import argparse
+import sys
+
+
+def benchmarks():
+    for module in (serializer, ring_buffer, channel):
+        yield from module.benchmarks()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run cuttlefish benchmarks.")
+    parser.add_argument("--filter", nargs="*", help="run only benchmarks whose name contains one of given strings")
+    parser.add_argument("--output", help="write results to a JSON file (eg. to be used as a baseline)")
+    parser.add_argument("--baseline", help="JSON file of results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown relative to baseline (default: 0.2, ie. 20 %%)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measured repeats (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.1,
+                        help="minimal duration of a repeat in seconds (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    results = Runner(repeat=args.repeat, min_time=args.min_time).run(benchmarks(), names=args.filter)
+    print(dump(results, args.output))
+
+    if not args.baseline:
+        return 0
+
+    regressions = compare(results, load(args.baseline), args.threshold)
+
+    for name, baseline_ns, current_ns, ratio in regressions:
+        print("Regression: {}: {:.1f} ns/op -> {:.1f} ns/op ({:+.0f} %)".format(
+            name, baseline_ns, current_ns, (ratio - 1) * 100
+        ), file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from cuttlefish.channel import Channel
+from cuttlefish.network_primitives import Unicast
+from cuttlefish.orchestrator import Orchestrator
+from cuttlefish.packet_management import Scheme, attr, get_scheme, layer, INT, STR
+from cuttlefish.scheduler import Scheduler, SYNCHRONOUS
+
+from adapter import socket
+
+from .runner import Benchmark
+
+
+# Seconds to wait for a packet to be processed by the receiving orchestrator
+TIMEOUT = 1
+
+
+def channel_ids():
+    channel_id = 1
+
+    while True:
+        yield channel_id
+        channel_id += 1
+
+
+def node(address):
+    orchestrator = Orchestrator()
+    scheduler = Scheduler(orchestrator)
+
+    scheme = Scheme(get_scheme(layer(attr("temp", 2, type=INT), attr("msg", 5, type=STR), attr("raw", 3))), {})
+
+    channel = Channel(channel_ids(), orchestrator, scheduler, scheme, Unicast(address))
+    orchestrator.add_channels(channel)
+
+    node_socket = socket(socket.AF_LORA, socket.SOCK_RAW)
+    channel.init_connection(node_socket, mode=SYNCHRONOUS, counter=True)
+
+    orchestrator.start()
+
+    return channel, node_socket
+
+
+def round_trip():
+    """
+    Send a packet from one simulated node to the other and wait until it is processed by the receiving orchestrator:
+    Channel.send -> Orchestrator -> uplink -> adapter.socket -> downlink -> Orchestrator -> Channel.process.
+    """
+    sender, sender_socket = node(b"AAAA")
+    receiver, receiver_socket = node(b"BBBB")
+
+    # Keep packets between the two nodes, so that buffers of other simulated nodes do not overflow
+    socket.links.update({
+        sender_socket.node_id: (receiver_socket.node_id,),
+        receiver_socket.node_id: (sender_socket.node_id,),
+    })
+
+    def operation():
+        sender.send([[2021, "hello", b"raw"]], b"BBBB")
+
+        if receiver.receive(timeout=TIMEOUT)[0] is None:
+            raise RuntimeError("Packet was not processed by receiving channel in {} s.".format(TIMEOUT))
+
+    return operation
+
+
+def benchmarks():
+    yield Benchmark("channel.round_trip", setup=round_trip)
@@ -0,0 +1,64 @@
+from cuttlefish.ring_buffer import ByteRing, RingBuffer, SPSCRingBuffer
+
+from .runner import Benchmark
+
+
+def push_pop(buffer_class=RingBuffer):
+    ring_buffer = buffer_class(10)
+    push = ring_buffer.push
+    pop = ring_buffer.pop
+
+    def operation():
+        push(b"packet")
+        pop()
+
+    return operation
+
+
+def fill_drain():
+    ring_buffer = RingBuffer(10)
+    push = ring_buffer.push
+    pop = ring_buffer.pop
+    packets = range(10)
+
+    def operation():
+        for packet in packets:
+            push(packet)
+        for _ in packets:
+            pop()
+
+    return operation
+
+
+def push_many_drain():
+    ring_buffer = RingBuffer(10)
+    push_many = ring_buffer.push_many
+    drain = ring_buffer.drain
+    packets = list(range(10))
+
+    def operation():
+        push_many(packets)
+        drain()
+
+    return operation
+
+
+def byte_ring_write_read():
+    byte_ring = ByteRing(512)
+    write_frame = byte_ring.write_frame
+    read_frame = byte_ring.read_frame
+    frame = bytearray(32)
+
+    def operation():
+        write_frame(frame)
+        read_frame()
+
+    return operation
+
+
+def benchmarks():
+    yield Benchmark("ring_buffer.push_pop", setup=push_pop)
+    yield Benchmark("ring_buffer.spsc_push_pop", setup=lambda: push_pop(SPSCRingBuffer))
+    yield Benchmark("ring_buffer.fill_drain", setup=fill_drain, packets=10)
+    yield Benchmark("ring_buffer.byte_ring_write_read", setup=byte_ring_write_read)
+    yield Benchmark("ring_buffer.push_many_drain", setup=push_many_drain, packets=10)
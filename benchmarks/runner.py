@@ -0,0 +1,161 @@
+import gc
+import json
+import platform
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class Benchmark:
+    """
+    A named operation measured by Runner. operation is called without arguments; setup, if defined, is called once
+    before the measurement and returns the operation to be measured. packets is the number of packets handled by a
+    single call of the operation, used to report packets per second for batch operations.
+    """
+
+    def __init__(self, name, operation=None, setup=None, packets=1):
+        self.name = name
+        self.operation = operation
+        self.setup = setup
+        self.packets = packets
+
+    def prepare(self):
+        return self.setup() if self.setup else self.operation
+
+
+class Runner:
+    """
+    Runner measures benchmarks and reports results as a JSON serializable dictionary:
+
+        {
+            "meta": {...},
+            "results": {
+                name: {"ops": int, "ns_per_op": float, "packets_per_s": float, "alloc_bytes_per_op": float},
+            },
+        }
+
+    Each benchmark is calibrated to run for at least min_time seconds per repeat; the fastest of repeats is reported.
+    Allocations are measured separately with tracemalloc, as the peak of memory allocated above the starting point
+    during a single operation.
+    """
+
+    def __init__(self, repeat=5, min_time=0.1):
+        self.repeat = repeat
+        self.min_time = min_time
+
+    def run(self, benchmarks, names=None):
+        results = {}
+
+        for benchmark in benchmarks:
+            if names and not any(name in benchmark.name for name in names):
+                continue
+
+            results[benchmark.name] = self.measure(benchmark)
+
+        return {"meta": meta(), "results": results}
+
+    def measure(self, benchmark):
+        operation = benchmark.prepare()
+
+        # Warm up, calibrate number of operations per repeat
+        number = 1
+
+        while True:
+            elapsed = timed(operation, number)
+
+            if elapsed >= self.min_time:
+                break
+
+            number *= 2 if elapsed < (self.min_time / 10) else 1 + int(self.min_time / max(elapsed, 1e-9))
+
+        best = min(timed(operation, number) for _ in range(self.repeat))
+        ns_per_op = best * 1e9 / number
+
+        return {
+            "ops": number,
+            "ns_per_op": round(ns_per_op, 1),
+            "packets_per_s": round(benchmark.packets * 1e9 / ns_per_op, 1),
+            "alloc_bytes_per_op": allocated_bytes(operation),
+        }
+
+
+def timed(operation, number):
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        start = time.perf_counter()
+
+        for _ in range(number):
+            operation()
+
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def allocated_bytes(operation):
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+
+    try:
+        operation()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+
+        operation()
+
+        return tracemalloc.get_traced_memory()[1] - start
+    finally:
+        tracemalloc.stop()
+
+
+def meta():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results to a baseline. Returns a list of (name, baseline ns/op, current ns/op, ratio) of benchmarks slower
+    than baseline by more than threshold (eg. 0.2 for 20 %).
+    """
+    regressions = []
+
+    for name, baseline_result in baseline.get("results", {}).items():
+        result = results["results"].get(name)
+
+        if not result:
+            continue
+
+        ratio = result["ns_per_op"] / baseline_result["ns_per_op"]
+
+        if ratio > (1 + threshold):
+            regressions.append((name, baseline_result["ns_per_op"], result["ns_per_op"], ratio))
+
+    return regressions
+
+
+def load(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def dump(results, path=None):
+    output = json.dumps(results, indent=2, sort_keys=True)
+
+    if path:
+        with open(path, "w") as output_file:
+            output_file.write(output + "\n")
+
+    return output
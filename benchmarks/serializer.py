@@ -0,0 +1,128 @@
+from cuttlefish.packet_management import Serializer, Scheme, attr, get_scheme, layer, INT, STR
+from cuttlefish.sec import HMAC
+
+from .runner import Benchmark
+
+try:
+    from adapter import AESEncryptSim
+except ImportError:
+    AESEncryptSim = None
+
+
+KEY = bytes(range(16))
+BATCH_SIZE = 32
+
+
+def size_callback(size_bytes):
+    return int.from_bytes(size_bytes, "big")
+
+
+def fixed():
+    scheme = Scheme(get_scheme(layer(attr("temp", 2, type=INT), attr("msg", 5, type=STR), attr("raw", 3))), {})
+
+    return Serializer(scheme), [[2021, "hello", b"raw"]]
+
+
+def variable():
+    scheme = Scheme(
+        get_scheme(layer(
+            attr("size", 1, type=INT), attr("payload", 0, parsing_callback=size_callback), attr("tail", 2, type=INT)
+        )),
+        {"payload": {0: ("size",)}},
+    )
+
+    return Serializer(scheme), [[32, bytes(32), 512]]
+
+
+def layers():
+    """
+    Layers added by Unicast with counter and acknowledgments.
+    """
+    serializer, data = fixed()
+
+    serializer.add_layer(headers=[attr("counter", 3, type=INT)])
+    serializer.add_layer(headers=[attr("packet_id", 1, type=INT), attr("ack_type", 1, type=INT),
+                                  attr("ack_await_id", 1, type=INT)])
+    serializer.add_layer(headers=[attr("sender_address", 4, type="b")])
+    serializer.add_layer(headers=[attr("address", 4, type="b")])
+
+    return serializer, data + [[5], [1, 2, 3], [b"AAAA"], [b"BBBB"]]
+
+
+def hmac():
+    serializer, data = layers()
+    measure = HMAC({0: (0, 1, 2)}, KEY, KEY)
+
+    return apply_measure(serializer, measure), measure.process_send(data, {})
+
+
+def aes():
+    serializer, data = fixed()
+    measure = AESEncryptSim({0: (0, 1, 2)}, KEY, KEY)
+
+    return apply_measure(serializer, measure), measure.process_send(data)
+
+
+def apply_measure(serializer, measure):
+    measure.apply(serializer)
+
+    serializer.encode_callbacks.append(measure.encode)
+    serializer.decode_callbacks.append(measure.decode)
+
+    return serializer
+
+
+def encode_benchmark(name, factory, lazy=False):
+    def setup():
+        serializer, data = factory()
+        serializer.lazy = lazy
+
+        return lambda: serializer.encode(data)
+
+    return Benchmark("serializer.encode.{}".format(name), setup=setup)
+
+
+def decode_benchmark(name, factory, lazy=False, access=False):
+    def setup():
+        serializer, data = factory()
+        serializer.lazy = lazy
+        packet = bytes(serializer.encode(data))
+
+        if access:
+            # Access every attribute of lazy records, as a consumer of the packet would
+            def decode():
+                for decoded_layer in serializer.decode(packet, {}):
+                    decoded_layer.values()
+
+            return decode
+
+        return lambda: serializer.decode(packet, {})
+
+    suffix = (".lazy_access" if access else ".lazy") if lazy else ""
+
+    return Benchmark("serializer.decode.{}{}".format(name, suffix), setup=setup)
+
+
+def decode_many_benchmark(name, factory):
+    def setup():
+        serializer, data = factory()
+        packets = [bytes(serializer.encode(data))] * BATCH_SIZE
+
+        return lambda: serializer.decode_many(packets)
+
+    return Benchmark("serializer.decode_many.{}".format(name), setup=setup, packets=BATCH_SIZE)
+
+
+def benchmarks():
+    schemes = [("fixed", fixed), ("variable", variable), ("layers", layers), ("hmac", hmac)]
+
+    if AESEncryptSim:
+        schemes.append(("aes", aes))
+
+    for name, factory in schemes:
+        yield encode_benchmark(name, factory)
+        yield decode_benchmark(name, factory)
+
+    yield decode_benchmark("layers", layers, lazy=True)
+    yield decode_benchmark("layers", layers, lazy=True, access=True)
+    yield decode_many_benchmark("layers", layers)
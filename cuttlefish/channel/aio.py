@@ -0,0 +1,115 @@
+from cuttlefish.ring_buffer import ticks_us, ticks_diff
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import uasyncio as asyncio
+    except ImportError:
+        asyncio = None
+
+
+def running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:
+        # MicroPython has a single event loop
+        return asyncio.get_event_loop()
+
+
+class ProcessedEvent:
+    """
+    Event of an event loop set by director thread whenever a packet of channel is processed, so that coroutines can
+    wait for processed packets without polling. Created on the loop the channel is received from, and created anew
+    if the channel is later received from another loop (eg. of a second asyncio.run).
+    """
+
+    def __init__(self, orchestrator, channel_id):
+        self.loop = running_loop()
+
+        # MicroPython event loop cannot be called from other threads, but provides a flag that can be set from them
+        if hasattr(asyncio, "ThreadSafeFlag"):
+            self.event = asyncio.ThreadSafeFlag()
+            self.threadsafe = True
+        else:
+            self.event = asyncio.Event()
+            self.threadsafe = False
+
+        orchestrator.processed_waker[channel_id] = self.wake
+
+    def wake(self):
+        if self.threadsafe:
+            self.event.set()
+            return
+
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # Loop is closed, nothing waits on it anymore
+            pass
+
+    def clear(self):
+        if not self.threadsafe:
+            self.event.clear()
+
+    async def wait(self, timeout=None):
+        """
+        Wait up to timeout seconds (None waits indefinitely) for a packet to be processed. Returns False on timeout.
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        return True
+
+
+async def receive_processed(channel, timeout=None):
+    """
+    Return a processed (data, meta) pair of channel, (None, {}) if none is processed within timeout seconds (None
+    waits indefinitely) or the channel is disconnected.
+    """
+    if (not channel.processed_event) or (channel.processed_event.loop is not running_loop()):
+        channel.processed_event = ProcessedEvent(channel.orchestrator, channel.channel_id)
+
+    event = channel.processed_event
+    running = channel.orchestrator.running
+    start = ticks_us()
+
+    while running[channel.channel_id]:
+        event.clear()
+        packet = channel.receive()
+
+        if packet[0] is not None:
+            return packet
+
+        if timeout is None:
+            await event.wait()
+            continue
+
+        remaining = timeout - ticks_diff(ticks_us(), start) / 1000000
+
+        if (remaining <= 0) or not await event.wait(remaining):
+            break
+
+    return None, {}
+
+
+class PacketIterator:
+    """
+    Asynchronous iterator over processed (data, meta) pairs of channel, ending once the channel is disconnected.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        packet = await receive_processed(self.channel)
+
+        if packet[0] is None:
+            raise StopAsyncIteration
+
+        return packet
@@ -14,9 +14,12 @@ class Channel:
         security_scheme=None,
         encode_callbacks=None,
         decode_callbacks=None,
+        lazy_decoding=False,
     ):
         self.channel_id = next(id_generator)
         self.processed_callback = None
+        # Wakes coroutines waiting in areceive, created on first use
+        self.processed_event = None
 
         self.orchestrator = orchestrator
         self.scheduler = scheduler
@@ -25,6 +28,7 @@ class Channel:
             decoding_scheme=decoding_scheme,
             encode_callbacks=encode_callbacks,
             decode_callbacks=decode_callbacks,
+            lazy=lazy_decoding,
         )
         self.network = network
         self.sec = Security(self.serializer, security_scheme)
@@ -51,6 +55,8 @@ class Channel:
         )
 
         self.sec.init_measures()
+        self.serializer.compile()
+
         self.orchestrator.processed_callback[self.channel_id] = processed_callback
 
     def get_id(self):
@@ -64,21 +70,33 @@ class Channel:
         if self.sec:
             self.sec.process_send(data, meta, *args)
 
-        serialized_data = self.serialize(data)
+        # Reserve space for channel id, written by orchestrator
+        headroom = self.orchestrator.headroom
+        serialized_data = self.serialize(data, headroom=headroom)
 
-        self.network.send(serialized_data, meta)
+        self.network.send(serialized_data, meta, headroom=headroom)
 
         return meta
 
-    def serialize(self, data):
-        return self.serializer.encode(data)
+    def serialize(self, data, headroom=0):
+        return self.serializer.encode(data, headroom=headroom)
 
     def deserialize(self, data, meta):
         return self.serializer.decode(data, meta)
 
+    def deserialize_many(self, packets):
+        return self.serializer.decode_many([packet[0] for packet in packets], [packet[1] for packet in packets])
+
     def process(self, data, meta, *args, **kwargs):
         decoded_data = self.deserialize(data, meta)
 
+        return self.process_decoded(decoded_data, meta, *args, **kwargs)
+
+    def process_decoded(self, decoded_data, meta, *args, **kwargs):
+        """
+        Apply security measures and network primitive to a deserialized packet. Unlike deserialization, this stage
+        keeps state (eg. counters, acknowledgments), so packets of a channel have to pass it one by one and in order.
+        """
         decoded_data = self.sec.process_recv(decoded_data, meta)
 
         if not decoded_data:
@@ -88,8 +106,84 @@ class Channel:
 
         return decoded_data
 
-    def receive(self):
-        return self.network.receive()
+    def process_many(self, packets, *args, **kwargs):
+        """
+        Process a batch of received (data, meta) pairs. Returns processed packets in order, None in place of packets
+        that could not be decoded or were dropped by security measures or the network primitive.
+        """
+        processed_packets = []
+
+        for decoded_data, meta in self.deserialize_each(packets):
+            try:
+                decoded_data = self.process_decoded(decoded_data, meta, *args, **kwargs) if decoded_data else None
+            except Exception:
+                decoded_data = None
+
+            processed_packets.append(decoded_data if decoded_data else None)
+
+        return processed_packets
+
+    def deserialize_each(self, packets):
+        """
+        Deserialize a batch of (data, meta) pairs. If the batch cannot be decoded at once, packets are decoded one by
+        one, with None in place of those that cannot be decoded (eg. of unexpected size).
+        """
+        try:
+            return self.deserialize_many(packets)
+        except Exception:
+            pass
+
+        decoded_packets = []
+
+        for data, meta in packets:
+            try:
+                decoded_packets.append((self.deserialize(data, meta), meta))
+            except Exception:
+                decoded_packets.append((None, meta))
+
+        return decoded_packets
+
+    def receive(self, timeout=0):
+        """
+        Return a processed (data, meta) pair, (None, {}) if none is available within timeout seconds (None waits
+        indefinitely).
+        """
+        return self.network.receive(timeout=timeout)
+
+    async def asend(self, data, *args, ack_type=0, **kwargs):
+        """
+        Send data from a coroutine, see send. Yields to the event loop once the packet is queued.
+        """
+        # Imported on use, so that channels not used from coroutines do not import asyncio
+        from .aio import asyncio
+
+        meta = self.send(data, *args, ack_type=ack_type, **kwargs)
+        await asyncio.sleep(0)
+
+        return meta
+
+    async def areceive(self, timeout=None):
+        """
+        Wait for a processed (data, meta) pair from a coroutine without blocking the event loop. Returns (None, {}) if
+        none is available within timeout seconds (None waits indefinitely) or the channel is disconnected.
+
+        Packets have to be received from the socket by something other than the caller, eg. AsyncScheduler or a
+        Reactor.
+        """
+        from .aio import receive_processed
+
+        return await receive_processed(self, timeout)
+
+    def __aiter__(self):
+        """
+        Iterate over processed (data, meta) pairs with async for, until the channel is disconnected.
+        """
+        from .aio import PacketIterator
+
+        return PacketIterator(self)
 
     def disconnect(self):
         self.network.disconnect()
+
+        if self.processed_event:
+            self.processed_event.wake()
@@ -1,5 +1,6 @@
 from cuttlefish.network_primitives.network import Network
 from cuttlefish.packet_management import attr, INT
+from cuttlefish.scheduler.reactor import start_listening
 
 try:
     from machine import Timer
@@ -9,7 +10,6 @@ except ModuleNotFoundError:
 from random import random
 import time
 
-import _thread
 import threading
 
 
@@ -154,11 +154,6 @@ class NetworkFloodingSim(Network):
             self.default_data.append([self.version_id])
 
     def scheduler_callback(self, *args, **kwargs):
-        def listen():
-            while True:
-                scheduler.downlink(self.downlink_arg)
-                time.sleep(0.01)
-
         scheduler = args[0]
         args = list(args)
         args.append(kwargs)
@@ -169,7 +164,7 @@ class NetworkFloodingSim(Network):
         self.start_interval()
 
         # TODO CHange for hardware
-        self.scheduler_thread = _thread.start_new_thread(listen, tuple())
+        self.scheduler_thread = start_listening(scheduler, self.downlink_arg)
 
     def start_interval(self):
         delta_i = self.I_MAX - self.I_MIN
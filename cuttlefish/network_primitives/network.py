@@ -131,22 +131,33 @@ class Network:
 
         return data
 
-    def send(self, data, *args, **kwargs):
-        self.orchestrator.send_packet(self.channel_id, data)
+    def send(self, data, *args, headroom=0, **kwargs):
+        meta = args[0] if args else {}
+
+        # Acknowledgments are sent ahead of other packets
+        urgent = bool(meta.get("ack_type", 0) & IS_ACK)
+
+        self.orchestrator.send_packet(self.channel_id, data, headroom=headroom, urgent=urgent)
 
         if self.immediate_send:
             self.immediate_send()
 
-    def receive(self):
+    def receive(self, timeout=0):
         if self.immediate_recv:
             self.immediate_recv()
 
-        return self.orchestrator.retrieve(self.channel_id)
+        return self.orchestrator.retrieve(self.channel_id, timeout=timeout)
 
     def disconnect(self):
         self.orchestrator.running[self.channel_id] = False
+
+        if self.scheduler:
+            self.scheduler.disconnect(self.channel_id)
+
         self.orchestrator.send[self.channel_id].clear()
-        self.orchestrator.processed[self.channel_id].clear()
+
+        if self.orchestrator.urgent.get(self.channel_id):
+            self.orchestrator.urgent[self.channel_id].clear()
 
     def find_remove(self, ack_id):
         """
@@ -221,7 +232,7 @@ class Network:
         if not packet_id:
             packet_id = self.new_id()
 
-        meta.update({"packet_id": packet_id})
+        meta.update({"packet_id": packet_id, "ack_type": ack_type})
         # print("Meta: {}".format(id(meta)))
 
         ack_layer = [packet_id, ack_type]
@@ -22,6 +22,14 @@ class ChannelDoesNotExist(Exception):
     pass
 
 
+class InvalidWeight(Exception):
+    """
+    Raised if a channel is given a weight that is not positive
+    """
+
+    pass
+
+
 class TaskBufferFull(Exception):
     """
     Issued when orchestrator buffer overflows
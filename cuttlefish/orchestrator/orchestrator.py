@@ -1,5 +1,6 @@
 from cuttlefish.ring_buffer import *
 from .errors import *
+from .workers import WorkerPool
 
 import _thread
 
@@ -13,96 +14,299 @@ SEND = 0
 RECEIVED = 1
 PROCESSED = 2
 
+CHANNEL_ID_SIZE = 1
+
 
 class Orchestrator:
     def __init__(
         self,
         max_process_buffer_size=10,
         max_buffer_size=10,
+        max_batch_size=8,
+        workers=0,
+        process_workers=0,
+        overflow=None,
+        send_buffer_bytes=None,
     ):
+        """
+        Every channel has its own task queue of max_process_buffer_size tasks. Director serves the queues by deficit
+        round-robin: in each round a channel may process up to weight * max_batch_size tasks (see add_channels), so
+        that a busy channel cannot starve the others.
+
+        If workers is set, received packets are decoded by a pool of worker threads instead of the director thread;
+        process_workers sets size of a process pool decoding channels passed to add_channels as process_channels.
+        Packets of a channel are delivered in receive order either way.
+
+        overflow sets RingBuffer overflow options of channel queues, as a dictionary of queue name ("tasks",
+        "processed", "send"): RingBuffer keyword arguments pairs, eg. {"processed": {"overflow": DROP_OLDEST}} to
+        shed old packets not retrieved by application or {"send": {"overflow": BLOCK, "timeout": 1}} to apply
+        backpressure to senders. Options can be overridden per channel in add_channels.
+
+        If send_buffer_bytes is set, packets to be sent are stored in a ByteRing of that many bytes per channel
+        instead of a RingBuffer of max_buffer_size packets (overflow options of send buffers do not apply then).
+        """
         self.rtc = RTC()
         self.rtc.init((0, 0, 0, 0, 0, 0, 0, 0))
 
-        self.tasks = RingBuffer(max_process_buffer_size)
+        self.max_process_buffer_size = max_process_buffer_size
+        self.overflow = overflow if overflow else {}
+        self.send_buffer_bytes = send_buffer_bytes
+        self.tasks = None
+        self.weights = None
+        self.deficits = None
+        self.dropped = None
         self.processed = None
         self.send = None
+        # Packets sent ahead of send buffer (eg. acknowledgments), by channel id; created on first use
+        self.urgent = {}
         self.max_buffer_size = max_buffer_size
+        self.max_batch_size = max_batch_size
+        # Bytes to be reserved by serializer at the start of packets to be sent
+        self.headroom = CHANNEL_ID_SIZE
+
+        self.pool = None
+
+        if workers or process_workers:
+            self.pool = WorkerPool(
+                self, max(workers, 1), max_jobs=max_process_buffer_size, process_workers=process_workers
+            )
 
-        self.task_lock = _thread.allocate_lock()
-        self.processed_lock = _thread.allocate_lock()
-        self.send_lock = _thread.allocate_lock()
+        # Director sleeps on task_signal until a task is added
+        self.task_signal = Signal()
+        self.director_lock = _thread.allocate_lock()
+        self.active = False
 
         self.director_thread = None
         self.channels = None
         self.running = None
 
         self.processed_callback = {}
+        # Callables run by director once a packet of channel is stored in processed buffer (eg. to wake an event loop)
+        self.processed_waker = {}
+
+        self.stats = {"wakeups": 0, "tasks": 0, "idle_us": 0, "busy_us": 0}
 
     def start(self):
+        if not self.channels:
+            raise UndefinedChannel("Orchestrator: no channel defined")
+
+        if self.pool:
+            self.pool.start()
+
+        self.active = True
+        self.director_lock.acquire()
         self.director_thread = _thread.start_new_thread(self.orchestrate, ())
 
-    def add_channels(self, *args):
+    def stop(self, timeout=None):
+        """
+        Stop director thread once the task it is processing is finished. Tasks left in the buffer are not processed.
+        Returns True if director thread stopped within timeout (in seconds), None waits indefinitely.
+        """
+        if not self.active:
+            return True
+
+        self.active = False
+        self.task_signal.set()
+
+        if timeout is None:
+            stopped = self.director_lock.acquire()
+        else:
+            stopped = self.director_lock.acquire(1, timeout)
+
+        if stopped:
+            self.director_lock.release()
+
+        if self.pool:
+            stopped = self.pool.stop(timeout) and stopped
+
+        return stopped
+
+    def idle_ratio(self):
+        """
+        Fraction of director thread time spent waiting for tasks.
+        """
+        stats = self.stats
+        total = stats["idle_us"] + stats["busy_us"]
+
+        return (stats["idle_us"] / total) if total else 1.0
+
+    def add_channels(self, *args, weights=None, process_channels=None, overflow=None):
+        """
+        Register channels. weights is a dictionary of channel id: weight pairs; weight of a channel is the share of
+        director time it gets while other channels have tasks queued as well, relative to the default of 1 (eg. 0.5
+        processes a batch every other round; weights must be positive). Channels whose ids are in process_channels are
+        decoded in the process pool (see process_workers). overflow is a dictionary of channel id: queue overflow
+        options pairs, overriding options set on initialization.
+        """
+        weights = weights if weights else {}
+        overflow = overflow if overflow else {}
+
+        for channel_id, weight in weights.items():
+            if weight <= 0:
+                raise InvalidWeight("Weight of channel {} must be positive, got {}.".format(channel_id, weight))
+
         self.channels = dict([(channel.get_id(), channel) for channel in args])
+        self.tasks = dict([
+            (channel_id, self.channel_queue("tasks", channel_id, overflow)) for channel_id in self.channels
+        ])
+        self.weights = dict([(channel.get_id(), weights.get(channel.get_id(), 1)) for channel in args])
+        self.deficits = dict([(channel.get_id(), 0) for channel in args])
+        # Tasks dropped on overflow of channel task queue and processed buffer respectively
+        self.dropped = dict([(channel.get_id(), {"tasks": 0, "processed": 0}) for channel in args])
         self.running = dict([(channel.get_id(), True) for channel in args])
-        self.processed = dict([(channel.get_id(), RingBuffer(self.max_buffer_size)) for channel in args])
-        self.send = dict([(channel.get_id(), RingBuffer(self.max_buffer_size)) for channel in args])
+        # Processed packets are pushed by director thread only
+        self.processed = dict([
+            (channel_id, self.channel_queue("processed", channel_id, overflow, single_producer=True))
+            for channel_id in self.channels
+        ])
+        self.send = dict([
+            (channel_id, self.channel_queue("send", channel_id, overflow)) for channel_id in self.channels
+        ])
+
+        if self.pool:
+            self.pool.add_channels(self.channels, process_channels)
+
+    def channel_queue(self, name, channel_id, overflow, single_producer=False):
+        """
+        Create a queue of channel. Queues with a single producer and consumer thread (eg. processed buffer, filled by
+        director and emptied by application) are lock-free SPSCRingBuffers, unless their overflow policy requires a
+        locked RingBuffer.
+        """
+        options = dict(self.overflow.get(name, {}))
+        options.update(overflow.get(channel_id, {}).get(name, {}))
+
+        if (name == "send") and self.send_buffer_bytes:
+            return ByteRing(self.send_buffer_bytes)
+
+        size = self.max_process_buffer_size if name == "tasks" else self.max_buffer_size
+
+        if single_producer and (options.get("overflow", RAISE) in SPSC_OVERFLOW_POLICIES):
+            return SPSCRingBuffer(size, **options)
 
-    def send_packet(self, channel_id, packet_bytes):
+        return RingBuffer(size, **options)
+
+    def send_packet(self, channel_id, packet_bytes, headroom=0, urgent=False):
+        """
+        Queue a packet to be sent through channel. If headroom is set, packet_bytes is a bytearray whose first
+        CHANNEL_ID_SIZE bytes were reserved by serializer and channel id is written in place. Urgent packets (eg.
+        acknowledgments) are queued separately and sent before all packets of the send buffer.
+
+        Returns number of packets queued, 0 if the packet was dropped by overflow policy of the send buffer.
+        """
         try:
-            self.send_lock.acquire()
+            send_buffer = self.send[channel_id]
+        except KeyError:
+            raise ChannelDoesNotExist(
+                "Orchestrator tried to queue a packet for a channel not in channel dictionary. Use add_channels method "
+                "to register channels."
+            )
 
-            packet_id = channel_id.to_bytes(1, "big")
+        if headroom:
+            packet_bytes[0] = channel_id
+        else:
+            packet_id = channel_id.to_bytes(CHANNEL_ID_SIZE, "big")
             packet_bytes = packet_id + packet_bytes
 
-            self.send[channel_id].push(packet_bytes)
+        if urgent:
+            send_buffer = self.urgent.get(channel_id)
 
-            return 1
+            if not send_buffer:
+                send_buffer = self.urgent[channel_id] = self.channel_queue("urgent", channel_id, {})
 
+        try:
+            return send_buffer.push(packet_bytes)
         except RingBufferOverflow:
             return 0
-        except KeyError:
-            raise (ChannelDoesNotExist, "Orchestrator tried to retrieve packets from a buffer for a channel not in "
-                                        "channel dictionary. Use add_channels method to register channels.")
-        finally:
-            self.send_lock.release()
 
     def get_packet(self, channel_id):
-        packet = None
+        """
+        Pop a packet to be sent, urgent ones first. Packets from a ByteRing send buffer are memoryviews valid until
+        the next call.
+        """
+        urgent_buffer = self.urgent.get(channel_id)
+
         try:
-            self.send_lock.acquire()
+            if urgent_buffer and urgent_buffer.current_size:
+                return urgent_buffer.pop()
 
-            packet = self.send[channel_id].pop()
+            return self.send[channel_id].pop()
         except RingBufferUnderflow:
-            pass
-        finally:
-            self.send_lock.release()
+            return None
 
-        return packet
+    def queued(self, channel_id):
+        """
+        Return number of packets waiting to be sent through channel and number of those that are urgent.
+        """
+        urgent_buffer = self.urgent.get(channel_id)
+        urgent = urgent_buffer.current_size if urgent_buffer else 0
+
+        return self.send[channel_id].current_size + urgent, urgent
 
     def add_task(self, channel_id, task_type, assignment):
+        """
+        Queue a task for channel. Returns number of tasks queued, 0 if the task was dropped by overflow policy of the
+        task queue. PROCESSED tasks are queued by director and workers, which never block on a full queue.
+        """
         try:
-            self.task_lock.acquire()
+            queue = self.tasks[channel_id]
+        except KeyError:
+            raise ChannelDoesNotExist(
+                "Orchestrator received a task for a channel not in channel dictionary. Use add_channels method to "
+                "register channels."
+            )
 
-            task = (channel_id, task_type, assignment)
-            self.tasks.push(task)
-        finally:
-            self.task_lock.release()
+        return self.queue_task(channel_id, queue, task_type, assignment)
 
-    def retrieve(self, channel_id):
+    def queue_task(self, channel_id, queue, task_type, assignment):
         try:
-            self.processed_lock.acquire()
+            queued = queue.push((task_type, assignment), blocking=(task_type == RECEIVED))
+        except RingBufferOverflow:
+            queued = 0
+
+        if queued:
+            self.task_signal.set()
+        else:
+            self.dropped[channel_id]["tasks"] += 1
+
+        return queued
+
+    def received_handler(self, channel_id):
+        """
+        Return a callable(channel_id, packet_bytes, meta) queuing packets received for channel, with its task queue
+        looked up once (eg. for demultiplexing table of scheduler). Returns None if channel is not registered.
+        """
+        if (not self.tasks) or (channel_id not in self.tasks):
+            return None
+
+        queue = self.tasks[channel_id]
+
+        def submit(received_channel_id, packet_bytes, meta):
+            return self.queue_task(channel_id, queue, RECEIVED, (packet_bytes, meta))
 
-            processed_data = self.processed[channel_id].pop()
+        return submit
 
-            return processed_data
+    def retrieve(self, channel_id, timeout=0):
+        """
+        Pop a processed (data, meta) pair of channel, waiting up to timeout seconds for one (None waits
+        indefinitely). Returns (None, {}) if no packet was processed or the channel is disconnected.
+        """
+        try:
+            processed_buffer = self.processed[channel_id]
+        except KeyError:
+            raise ChannelDoesNotExist(
+                "Orchestrator tried to retrieve packets from a buffer for a channel not in channel dictionary. Use "
+                "add_channels method to register channels."
+            )
 
+        if not self.running[channel_id]:
+            # Packets left by a disconnected channel are dropped here, by the consumer of the processed buffer
+            processed_buffer.clear()
+            return None, {}
+
+        try:
+            return processed_buffer.pop(timeout)
         except RingBufferUnderflow:
             return None, {}
-        except KeyError:
-            raise(ChannelDoesNotExist, "Orchestrator tried to retrieve packets from a buffer for a channel not in "
-                                       "channel dictionary. Use add_channels method to register channels.")
-        finally:
-            self.processed_lock.release()
 
     def orchestrate(self):
         """
@@ -115,46 +319,156 @@ class Orchestrator:
             0... to be sent
             1... received
             2... processed
+
+        Director thread sleeps until a task is added and then processes tasks until all queues are empty, so that no
+        CPU time is spent while idle. Time spent waiting and processing is accounted in stats.
+        """
+        stats = self.stats
+
+        try:
+            while self.active:
+                idle_start = ticks_us()
+                self.task_signal.wait()
+                busy_start = ticks_us()
+
+                stats["wakeups"] += 1
+                stats["idle_us"] += ticks_diff(busy_start, idle_start)
+
+                # Rounds go on while tasks are queued, a channel of low weight may need several to process one
+                while self.active and (self.schedule() or self.waiting()):
+                    pass
+
+                stats["busy_us"] += ticks_diff(ticks_us(), busy_start)
+        finally:
+            self.active = False
+            self.director_lock.release()
+
+    def schedule(self):
+        """
+        Run a single deficit round-robin round over channel task queues. Every channel with tasks queued is credited
+        weight * max_batch_size tasks and processes as many as its credit allows; credit not used up is kept for the
+        next round while tasks are waiting. Returns number of tasks processed.
+        """
+        processed = 0
+
+        for channel_id, queue in self.tasks.items():
+            if not queue.current_size:
+                self.deficits[channel_id] = 0
+                continue
+
+            deficit = self.deficits[channel_id] + self.weights[channel_id] * self.max_batch_size
+            tasks = queue.pop_many(int(deficit))
+
+            self.deficits[channel_id] = (deficit - len(tasks)) if queue.current_size else 0
+            self.stats["tasks"] += len(tasks)
+            processed += len(tasks)
+
+            self.process_tasks(channel_id, tasks)
+
+        return processed
+
+    def waiting(self):
+        """
+        Return True if any channel has tasks queued.
+        """
+        for queue in self.tasks.values():
+            if queue.current_size:
+                return True
+
+        return False
+
+    def process_tasks(self, channel_id, tasks):
         """
-        while True:
-            if not self.channels:
-                raise UndefinedChannel("Orchestrator: no channel defined")
+        Process tasks of a channel in order; consecutive RECEIVED tasks are processed as one batch. A task that fails
+        (eg. on overflow of a buffer of the network primitive) is dropped and counted in dropped, so that director
+        goes on serving all channels.
+        """
+        batch = []
+
+        for task_type, content in tasks:
+            if task_type == RECEIVED:
+                batch.append(content)
+                continue
 
-            self.task_lock.acquire()
+            self.process_batch(channel_id, batch)
+            batch = []
 
             try:
-                task = self.tasks.pop()
+                self.process_task(channel_id, task_type, content)
+            except Exception:
+                self.dropped[channel_id]["tasks"] += 1
 
-                self.process_task(task[0], task[1], task[2])
+        self.process_batch(channel_id, batch)
 
-            except RingBufferUnderflow:
-                pass
-            except RingBufferOverflow:
-                # Drop tasks if buffer is overflowing
-                pass
-            except KeyError:
-                raise ChannelDoesNotExist(
-                    "Orchestrator tried to access channel that has not been added."
-                )
-            finally:
-                self.task_lock.release()
+    def process_batch(self, channel_id, batch):
+        try:
+            if len(batch) == 1:
+                self.process_task(channel_id, RECEIVED, batch[0])
+            elif batch:
+                self.process_received(channel_id, batch)
+        except Exception:
+            self.dropped[channel_id]["tasks"] += len(batch)
+
+    def process_received(self, channel_id, batch):
+        if not self.running[channel_id]:
+            return
+
+        if self.pool:
+            self.pool.dispatch(channel_id, batch)
+            return
+
+        decoded_packets = self.channels[channel_id].process_many(batch)
+
+        for decoded, content in zip(decoded_packets, batch):
+            meta = content[1]
+            meta.update({"time_processed": self.rtc.now()})
+
+            if decoded:
+                self.add_task(channel_id, PROCESSED, (decoded, meta))
+
+    def process_decoded(self, channel_id, decoded_data, meta):
+        """
+        Finish processing of a packet decoded by worker pool.
+        """
+        if not self.running[channel_id]:
+            return
+
+        decoded = self.channels[channel_id].process_decoded(decoded_data, meta)
+        meta.update({"time_processed": self.rtc.now()})
+
+        if decoded:
+            self.add_task(channel_id, PROCESSED, (decoded, meta))
 
     def process_task(self, channel_id, assignment, content):
         if not self.running[channel_id]:
             return
 
-        if assignment == RECEIVED:
+        if (assignment == RECEIVED) and self.pool:
+            self.pool.dispatch(channel_id, [content])
+
+        elif assignment == RECEIVED:
             data, meta = content
             decoded = self.channels[channel_id].process(data, meta)
             meta.update({"time_processed": self.rtc.now()})
 
             if decoded:
-                task = (channel_id, 2, (decoded, meta))
-                self.tasks.push(task)
+                self.add_task(channel_id, PROCESSED, (decoded, meta))
 
         elif assignment == PROCESSED:
             # TODO: not use processed buffer if processed_callback is defined?
-            self.processed[channel_id].push(content)
+            try:
+                queued = self.processed[channel_id].push(content, blocking=False)
+            except RingBufferOverflow:
+                queued = 0
+
+            if not queued:
+                self.dropped[channel_id]["processed"] += 1
+            elif self.processed_waker.get(channel_id):
+                try:
+                    self.processed_waker.get(channel_id)()
+                except Exception:
+                    # A failing waker (eg. of an event loop gone) must not stop the director, it is dropped
+                    self.processed_waker.pop(channel_id, None)
 
             if self.processed_callback.get(channel_id):
                 self.processed_callback.get(channel_id)(content)
@@ -0,0 +1,270 @@
+from cuttlefish.ring_buffer import RingBuffer, RingBufferOverflow, RingBufferUnderflow, Signal
+
+import _thread
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+
+class WorkerPool:
+    """
+    WorkerPool processes received packets on several threads. Processing is split into two stages:
+
+        decode   |  deserialization and decoding callbacks (eg. HMAC check, AES decryption); stateless, runs on any
+                    worker in parallel
+        process  |  security measures and network primitive (Channel.process_decoded); keeps state (counters,
+                    acknowledgments), runs for one batch of a channel at a time in receive order
+
+    Batches of received packets are numbered per channel when dispatched. A decoded batch is kept in a reorder buffer
+    until all batches of the channel dispatched before it have been processed, so that packets are delivered to the
+    processed buffer in receive order regardless of which worker decoded them.
+
+    Channels listed as process channels are decoded in a pool of processes instead (if concurrent.futures is
+    available, eg. on a CPython gateway), which lets crypto-heavy channels use more than one core. Their serializers
+    are copied to worker processes when the pool is first used, so the connection has to be initialized by then.
+    """
+
+    def __init__(self, orchestrator, size, max_jobs=None, process_workers=0):
+        self.orchestrator = orchestrator
+        self.size = size
+        self.process_workers = process_workers if ProcessPoolExecutor else 0
+
+        self.jobs = RingBuffer(max_jobs if max_jobs else 4 * size)
+        self.job_signal = Signal()
+        self.executor = None
+        # Decoding jobs submitted to the process pool and not finished yet
+        self.futures = set()
+        self.futures_lock = _thread.allocate_lock()
+
+        self.active = False
+        self.alive = 0
+        self.alive_lock = _thread.allocate_lock()
+        self.stopped_lock = _thread.allocate_lock()
+
+        self.process_channels = set()
+        self.sequence = {}
+        self.expected = {}
+        self.completed = {}
+        self.channel_locks = {}
+
+        self.stats = {"batches": 0, "errors": 0, "dropped": 0}
+        # Stats are counted by director, workers and the process pool callback thread
+        self.stats_lock = _thread.allocate_lock()
+
+    def count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def add_channels(self, channel_ids, process_channels=None):
+        for channel_id in channel_ids:
+            self.sequence[channel_id] = 0
+            self.expected[channel_id] = 0
+            self.completed[channel_id] = {}
+            self.channel_locks[channel_id] = _thread.allocate_lock()
+
+        self.process_channels = set(process_channels) if (process_channels and self.process_workers) else set()
+
+    def start(self):
+        self.active = True
+        self.alive = self.size
+        self.stopped_lock.acquire()
+
+        for _ in range(self.size):
+            _thread.start_new_thread(self.work, ())
+
+    def stop(self, timeout=None):
+        if not self.active:
+            return True
+
+        self.active = False
+        self.job_signal.set()
+
+        if timeout is None:
+            stopped = self.stopped_lock.acquire()
+        else:
+            stopped = self.stopped_lock.acquire(1, timeout)
+
+        if stopped:
+            self.stopped_lock.release()
+
+        if self.executor:
+            # Batches not decoded yet are dropped, the one being decoded is waited for
+            with self.futures_lock:
+                futures = list(self.futures)
+
+            for future in futures:
+                future.cancel()
+
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+        return stopped
+
+    def dispatch(self, channel_id, batch):
+        """
+        Queue a batch of received (data, meta) pairs of a channel to be decoded. Called by the director thread only.
+        """
+        sequence = self.sequence[channel_id]
+
+        if channel_id in self.process_channels:
+            self.submit_remote(channel_id, sequence, batch)
+        else:
+            try:
+                self.jobs.push((channel_id, sequence, batch))
+            except RingBufferOverflow:
+                self.count("dropped", len(batch))
+                return
+
+            self.job_signal.set()
+
+        self.sequence[channel_id] = sequence + 1
+
+    def work(self):
+        try:
+            while self.active:
+                self.job_signal.wait()
+
+                while self.active:
+                    try:
+                        channel_id, sequence, batch = self.jobs.pop()
+                    except RingBufferUnderflow:
+                        break
+
+                    # Wake another worker if more jobs are waiting
+                    if self.jobs.current_size:
+                        self.job_signal.set()
+
+                    self.complete(channel_id, sequence, self.decode(channel_id, batch))
+        finally:
+            # Pass the stop signal on to the next worker
+            self.job_signal.set()
+
+            with self.alive_lock:
+                self.alive -= 1
+
+                if not self.alive:
+                    self.stopped_lock.release()
+
+    def decode(self, channel_id, batch):
+        channel = self.orchestrator.channels[channel_id]
+
+        try:
+            return channel.deserialize_many(batch)
+        except Exception:
+            pass
+
+        # Decode packets one by one, dropping those that cannot be decoded (eg. of unexpected size)
+        decoded_packets = []
+
+        for data, meta in batch:
+            try:
+                decoded_packets.append((channel.deserialize(data, meta), meta))
+            except Exception:
+                self.count("errors")
+
+        return decoded_packets
+
+    def submit_remote(self, channel_id, sequence, batch):
+        if not self.executor:
+            serializers = dict(
+                (process_channel, self.orchestrator.channels[process_channel].serializer)
+                for process_channel in self.process_channels
+            )
+
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.process_workers, initializer=init_process, initargs=(serializers,)
+            )
+
+        future = self.executor.submit(decode_remote, channel_id, [packet[0] for packet in batch])
+
+        with self.futures_lock:
+            self.futures.add(future)
+
+        future.add_done_callback(lambda result: self.complete_remote(channel_id, sequence, batch, result))
+
+    def complete_remote(self, channel_id, sequence, batch, future):
+        with self.futures_lock:
+            self.futures.discard(future)
+
+        if future.cancelled():
+            self.count("dropped", len(batch))
+            return
+
+        decoded_packets = []
+
+        try:
+            decoder = self.orchestrator.channels[channel_id].serializer.get_decoder()
+
+            for (data, meta), result in zip(batch, future.result()):
+                if result is None:
+                    self.count("errors")
+                    continue
+
+                layers, redundant_bytes = result
+
+                decoded = [
+                    compiled_layer.record.from_items(items) for compiled_layer, items in zip(decoder.layers, layers)
+                ]
+                meta.update({"redundant_bytes": redundant_bytes})
+
+                decoded_packets.append((decoded, meta))
+        except Exception:
+            self.count("errors")
+
+        self.complete(channel_id, sequence, decoded_packets)
+
+    def complete(self, channel_id, sequence, decoded_packets):
+        """
+        Store a decoded batch and process all batches of the channel that are next in receive order.
+        """
+        orchestrator = self.orchestrator
+
+        with self.channel_locks[channel_id]:
+            completed = self.completed[channel_id]
+            completed[sequence] = decoded_packets
+
+            expected = self.expected[channel_id]
+
+            while expected in completed:
+                for decoded, meta in completed.pop(expected):
+                    try:
+                        orchestrator.process_decoded(channel_id, decoded, meta)
+                    except RingBufferOverflow:
+                        self.count("dropped")
+                    except Exception:
+                        self.count("errors")
+
+                expected += 1
+                self.count("batches")
+
+            self.expected[channel_id] = expected
+
+
+# Serializers of process channels, set in each worker process by init_process
+process_serializers = {}
+
+
+def init_process(serializers):
+    process_serializers.update(serializers)
+
+
+def decode_remote(channel_id, packets):
+    """
+    Decode packets of a channel in a worker process. Records are returned as lists of (name, value) pairs, None in
+    place of packets that could not be decoded.
+    """
+    serializer = process_serializers[channel_id]
+    results = []
+
+    for data in packets:
+        meta = {}
+
+        try:
+            decoded = serializer.decode(data, meta)
+            results.append(([list(decoded_layer.items()) for decoded_layer in decoded], meta.get("redundant_bytes")))
+        except Exception:
+            results.append(None)
+
+    return results
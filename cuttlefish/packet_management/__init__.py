@@ -1,2 +1,4 @@
 from .scheme import *
 from .serializer import *
+from .codec import *
+from .record import *
@@ -0,0 +1,734 @@
+from .errors import (
+    UnexpectedInputSize,
+    AttributeTypeNotRecognized,
+    DependencyNotResolvable,
+)
+from .scheme import BYTES, INT, STR
+from .record import record_class, lazy_record_class
+
+try:
+    from struct import Struct, error as StructError
+except ImportError:
+    # MicroPython's struct module has no Struct class
+    from struct import calcsize, pack, pack_into, unpack_from
+
+    StructError = ValueError
+
+    class Struct:
+        def __init__(self, format):
+            self.format = format
+            self.size = calcsize(format)
+
+        def pack(self, *args):
+            return pack(self.format, *args)
+
+        def pack_into(self, buffer, offset, *args):
+            pack_into(self.format, buffer, offset, *args)
+
+        def unpack_from(self, buffer, offset=0):
+            return unpack_from(self.format, buffer, offset)
+
+
+DELIMITER = "*"
+
+# Struct codes of unsigned integers that can be packed natively
+NATIVE_INT_CODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+class CompiledAttribute:
+    """
+    Attribute definition resolved once at compile time. Holds the position of the attribute within its layer and
+    within the frame together with type converters, so that no scheme lookups are necessary per packet.
+    """
+
+    def __init__(self, attribute_scheme, layer_i, index, trailer=False):
+        self.scheme = attribute_scheme
+        self.name = attribute_scheme.get("name")
+        self.size = attribute_scheme.get("size")
+        self.layer = layer_i
+        self.index = index
+        self.trailer = trailer
+        self.parsing_callback = attribute_scheme.get("parsing_callback")
+        self.parsing_callback = self.parsing_callback if self.parsing_callback else default_callback
+
+        # (layer index, attribute name) pairs of attributes size of a variable size attribute depends on
+        self.requisites = ()
+
+        self.encode_type, self.decode_type = type_converters(attribute_scheme)
+        self.code = struct_code(attribute_scheme)
+
+    def resolve_size(self, decoded_layers):
+        """
+        Resolve size of an attribute of variable size from byte data of its requisite attributes. decoded_layers
+        holds {name: byte data} of layers decoded so far, indexed by layer.
+        """
+        size = self.parsing_callback(*[decoded_layers[layer_i][name] for layer_i, name in self.requisites])
+
+        return size if size else self.size
+
+    def __repr__(self):
+        return "CompiledAttribute({}, {}, layer={}, index={})".format(self.name, self.size, self.layer, self.index)
+
+
+class CompiledLayer:
+    def __init__(self, layer_scheme, layer_i):
+        self.scheme = layer_scheme
+        self.layer = layer_i
+
+        self.headers = []
+        self.trailers = []
+
+        trailer = False
+
+        for attribute_scheme in layer_scheme:
+            if attribute_scheme == DELIMITER:
+                trailer = True
+                continue
+
+            index = len(self.headers) + len(self.trailers)
+            attribute = CompiledAttribute(attribute_scheme, layer_i, index, trailer=trailer)
+
+            if trailer:
+                self.trailers.append(attribute)
+            else:
+                self.headers.append(attribute)
+
+        self.headers = tuple(self.headers)
+        self.trailers = tuple(self.trailers)
+        self.delimited = trailer
+
+        self.attributes = self.headers + self.trailers
+        self.names = tuple(attribute.name for attribute in self.attributes)
+        self.record = record_class(self.names)
+        self.fixed = all(attribute.size for attribute in self.attributes)
+
+        self.encoders = tuple(attribute.encode_type for attribute in self.attributes)
+        self.decoders = tuple(attribute.decode_type for attribute in self.attributes)
+
+        self.lazy_record = lazy_record_class(self.names, self.decoders)
+        # (offset, size) of attributes within a frame, set if the scheme has a fixed layout
+        self.fixed_offsets = None
+
+        self.header_segments = segments(self.headers)
+        # Trailers are consumed from the end of a frame
+        self.trailer_segments = tuple(reversed(segments(self.trailers)))
+
+
+class FrameCursor:
+    """
+    Head and tail cursors over a single memoryview of a frame. Headers are consumed from the head, trailers from the
+    tail; bytes left between the two cursors once all layers are decoded are redundant.
+    """
+
+    def __init__(self, input_bytes):
+        self.view = memoryview(input_bytes)
+        self.head = 0
+        self.tail = len(self.view)
+
+    def take(self, size):
+        start = self.head
+        end = start + size
+
+        if end > self.tail:
+            raise UnexpectedInputSize(
+                "Size of input received ({}) was smaller than expected by scheme definition ({}).".format(
+                    self.tail - start, size
+                )
+            )
+
+        self.head = end
+
+        return start
+
+    def take_tail(self, size):
+        end = self.tail
+        start = end - size
+
+        if start < self.head:
+            raise UnexpectedInputSize(
+                "Size of input received ({}) was smaller than expected by scheme definition ({}).".format(
+                    end - self.head, size
+                )
+            )
+
+        self.tail = start
+
+        return start
+
+    def unpack(self, segment_struct, start):
+        return segment_struct.unpack_from(self.view, start)
+
+    def slice(self, start, size):
+        return bytes(self.view[start:start + size])
+
+    def remaining(self):
+        return bytes(self.view[self.head:self.tail])
+
+
+class SchemeCodec:
+    """
+    SchemeCodec is a frozen codec compiled from a Scheme once all layers and attributes have been added to it.
+
+    Attribute order within a frame is resolved at compile time: headers are placed from the outermost layer inwards,
+    trailers from the innermost layer outwards. If no attribute of the scheme has variable size, the whole frame is
+    described by a single struct format with precomputed offsets. Two formats are kept:
+
+        raw     |  every attribute is packed as bytes ("Ns"), used when encode or decode callbacks need to see
+                |  byte data before type conversion
+        typed   |  big endian integers of size 1, 2, 4 or 8 are packed natively, skipping type conversion
+
+    Schemes containing attributes of variable size (size == 0) have no fixed layout; fixed_size is then None and
+    attribute sizes have to be resolved from dependencies per packet.
+    """
+
+    def __init__(self, scheme):
+        self.scheme = scheme
+        self.dependencies = scheme.dependencies if scheme.dependencies else {}
+
+        self.layers = tuple(CompiledLayer(layer_scheme, i) for i, layer_scheme in enumerate(scheme.scheme))
+        self.layer_count = len(self.layers)
+
+        # Frame order of attributes
+        frame = []
+
+        for compiled_layer in reversed(self.layers):
+            frame.extend(compiled_layer.headers)
+
+        for compiled_layer in self.layers:
+            frame.extend(compiled_layer.trailers)
+
+        self.frame = tuple(frame)
+        self.frame_positions = tuple((attribute.layer, attribute.index) for attribute in self.frame)
+
+        # Frame positions of attributes, in layer order
+        frame_index = dict(((attribute.layer, attribute.index), i) for i, attribute in enumerate(self.frame))
+        self.layer_positions = tuple(
+            tuple(frame_index[(compiled_layer.layer, attribute.index)] for attribute in compiled_layer.attributes)
+            for compiled_layer in self.layers
+        )
+
+        self.fixed_size = None
+        self.raw_struct = None
+        self.typed_struct = None
+        self.typed_decoders = ()
+        self.typed_encoders = ()
+        self.sized = ()
+
+        # Size of attributes of fixed size, frame positions of attributes of variable size
+        self.static_size = sum(attribute.size for attribute in self.frame)
+        self.variable_positions = tuple(i for i, attribute in enumerate(self.frame) if not attribute.size)
+        self.frame_segments = segments(self.frame)
+
+        compile_dependencies(self)
+
+        # Frame length can be determined from the head of a frame unless a trailer of variable size depends on
+        # another trailer
+        headers = set((attribute.layer, attribute.name) for attribute in self.frame if not attribute.trailer)
+        self.delimited = all(
+            all(requisite in headers for requisite in attribute.requisites)
+            for attribute in self.frame if attribute.trailer and not attribute.size
+        )
+        self.requisite_keys = set(
+            requisite for attribute in self.frame for requisite in attribute.requisites
+        )
+
+        if all(compiled_layer.fixed for compiled_layer in self.layers):
+            self.compile_fixed()
+
+    def compile_fixed(self):
+        raw_format = ">" + "".join("{}s".format(attribute.size) for attribute in self.frame)
+        typed_format = ">" + "".join(
+            attribute.code if attribute.code else "{}s".format(attribute.size) for attribute in self.frame
+        )
+
+        self.raw_struct = Struct(raw_format)
+        self.typed_struct = Struct(typed_format)
+        self.fixed_size = self.raw_struct.size
+
+        # Attributes not packed natively still need to be converted
+        self.typed_decoders = tuple(
+            (i, attribute.decode_type) for i, attribute in enumerate(self.frame)
+            if (not attribute.code) and (attribute.decode_type is not None)
+        )
+        self.typed_encoders = tuple(
+            (i, attribute.encode_type) for i, attribute in enumerate(self.frame)
+            if (not attribute.code) and (attribute.encode_type is not None)
+        )
+        # Attributes packed as bytes, whose size has to be checked before packing
+        self.sized = tuple((i, attribute.size) for i, attribute in enumerate(self.frame) if not attribute.code)
+
+        offsets = {}
+        offset = 0
+
+        for attribute in self.frame:
+            offsets[(attribute.layer, attribute.index)] = (offset, attribute.size)
+            offset += attribute.size
+
+        for compiled_layer in self.layers:
+            compiled_layer.fixed_offsets = tuple(
+                offsets[(compiled_layer.layer, attribute.index)] for attribute in compiled_layer.attributes
+            )
+
+    def encode(self, attributes):
+        """
+        Encode attributes into a frame in one step, without exposing byte data of individual attributes.
+        Requires a fixed layout.
+        """
+        values = self.typed_values(attributes)
+
+        try:
+            return self.typed_struct.pack(*values)
+        except StructError:
+            # Reproduce errors raised by type conversion
+            return self.encode_layers(self.encode_type(attributes))
+
+    def encode_into(self, buffer, offset, attributes):
+        """
+        Encode attributes in one step into buffer, starting at offset. Requires a fixed layout. Returns offset of the
+        end of the frame.
+        """
+        values = self.typed_values(attributes)
+        end = offset + self.fixed_size
+
+        check_buffer_size(buffer, end)
+
+        try:
+            self.typed_struct.pack_into(buffer, offset, *values)
+        except StructError:
+            return self.encode_layers_into(buffer, offset, self.encode_type(attributes))
+
+        return end
+
+    def typed_values(self, attributes):
+        values = [attributes[layer_i][index] for layer_i, index in self.frame_positions]
+
+        for i, encoder in self.typed_encoders:
+            values[i] = encoder(values[i])
+
+        for i, size in self.sized:
+            check_attribute_size(values[i], size)
+
+        return values
+
+    def decode(self, input_bytes):
+        """
+        Decode a frame into type converted layers in one step. Requires a fixed layout.
+        """
+        self.check_input_size(input_bytes)
+
+        values = list(self.typed_struct.unpack_from(input_bytes))
+
+        for i, decoder in self.typed_decoders:
+            values[i] = decoder(values[i])
+
+        return self.build_layers(values), bytes(input_bytes[self.fixed_size:])
+
+    def encode_type(self, attributes):
+        encoded_attributes = []
+
+        for i, compiled_layer in enumerate(self.layers):
+            encoded_attributes.append([
+                encoder(attribute) if encoder else attribute
+                for encoder, attribute in zip(compiled_layer.encoders, attributes[i])
+            ])
+
+        return encoded_attributes
+
+    def encode_layers(self, attributes):
+        values = self.frame_values(attributes)
+
+        if self.fixed_size is not None:
+            return self.raw_struct.pack(*values)
+
+        return b"".join(values)
+
+    def encode_layers_into(self, buffer, offset, attributes):
+        """
+        Write byte data of attributes into buffer, starting at offset. Returns offset of the end of the frame.
+        """
+        values = self.frame_values(attributes)
+
+        if self.fixed_size is not None:
+            end = offset + self.fixed_size
+            check_buffer_size(buffer, end)
+
+            self.raw_struct.pack_into(buffer, offset, *values)
+
+            return end
+
+        check_buffer_size(buffer, offset + self.static_size + sum(len(values[i]) for i in self.variable_positions))
+
+        i = 0
+
+        for segment_struct, segment in self.frame_segments:
+            count = len(segment.attributes)
+
+            if segment_struct:
+                segment_struct.pack_into(buffer, offset, *values[i:i + count])
+                offset += segment_struct.size
+            else:
+                value = values[i]
+                buffer[offset:offset + len(value)] = value
+                offset += len(value)
+
+            i += count
+
+        return offset
+
+    def frame_size(self, attributes):
+        """
+        Size of the frame encoded from byte data of attributes.
+        """
+        if self.fixed_size is not None:
+            return self.fixed_size
+
+        return self.static_size + sum(
+            len(attributes[self.frame_positions[i][0]][self.frame_positions[i][1]]) for i in self.variable_positions
+        )
+
+    def frame_values(self, attributes):
+        values = [attributes[layer_i][index] for layer_i, index in self.frame_positions]
+
+        for attribute, value in zip(self.frame, values):
+            check_attribute_size(value, attribute.size)
+
+        return values
+
+    def decode_layers(self, input_bytes):
+        """
+        Split a frame into layers of byte data. Returns decoded layers and bytes not described by the scheme.
+        """
+        if self.fixed_size is not None:
+            self.check_input_size(input_bytes)
+
+            values = self.raw_struct.unpack_from(input_bytes)
+
+            return self.build_layers(values), bytes(input_bytes[self.fixed_size:])
+
+        cursor = FrameCursor(input_bytes)
+        decoded_layers = [None] * self.layer_count
+
+        # Layers are decoded from the outermost one inwards
+        for compiled_layer in reversed(self.layers):
+            values = {}
+            decoded_layers[compiled_layer.layer] = values
+
+            for segment_struct, attributes in compiled_layer.header_segments:
+                if segment_struct:
+                    start = cursor.take(segment_struct.size)
+                    values.update(zip(attributes.names, cursor.unpack(segment_struct, start)))
+                else:
+                    attribute = attributes.attribute
+                    size = attribute.resolve_size(decoded_layers)
+                    values[attribute.name] = cursor.slice(cursor.take(size), size)
+
+            for segment_struct, attributes in compiled_layer.trailer_segments:
+                if segment_struct:
+                    start = cursor.take_tail(segment_struct.size)
+                    values.update(zip(attributes.names, cursor.unpack(segment_struct, start)))
+                else:
+                    attribute = attributes.attribute
+                    size = attribute.resolve_size(decoded_layers)
+                    values[attribute.name] = cursor.slice(cursor.take_tail(size), size)
+
+        for i, compiled_layer in enumerate(self.layers):
+            values = decoded_layers[i]
+            decoded_layers[i] = compiled_layer.record(*[values[name] for name in compiled_layer.names])
+
+        return decoded_layers, cursor.remaining()
+
+    def decode_lazy(self, input_bytes):
+        """
+        Decode a frame into lazy records holding offsets of attributes only. For a fixed layout offsets are known in
+        advance; otherwise attributes of variable size are resolved from their dependencies, materializing only byte
+        data of requisite attributes. Returns decoded layers and bytes not described by the scheme.
+        """
+        view = memoryview(input_bytes)
+
+        if self.fixed_size is not None:
+            self.check_input_size(input_bytes)
+
+            decoded_layers = [
+                compiled_layer.lazy_record(view, compiled_layer.fixed_offsets) for compiled_layer in self.layers
+            ]
+
+            return decoded_layers, bytes(view[self.fixed_size:])
+
+        cursor = FrameCursor(view)
+        requisites = [{} for _ in self.layers]
+        decoded_layers = [None] * self.layer_count
+
+        for compiled_layer in reversed(self.layers):
+            offsets = [None] * len(compiled_layer.attributes)
+
+            for attribute in compiled_layer.headers:
+                size = attribute.size if attribute.size else attribute.resolve_size(requisites)
+                offsets[attribute.index] = (cursor.take(size), size)
+
+                if (attribute.layer, attribute.name) in self.requisite_keys:
+                    requisites[attribute.layer][attribute.name] = cursor.slice(offsets[attribute.index][0], size)
+
+            for attribute in reversed(compiled_layer.trailers):
+                size = attribute.size if attribute.size else attribute.resolve_size(requisites)
+                offsets[attribute.index] = (cursor.take_tail(size), size)
+
+                if (attribute.layer, attribute.name) in self.requisite_keys:
+                    requisites[attribute.layer][attribute.name] = cursor.slice(offsets[attribute.index][0], size)
+
+            decoded_layers[compiled_layer.layer] = compiled_layer.lazy_record(view, tuple(offsets))
+
+        return decoded_layers, cursor.remaining()
+
+    def decode_type(self, attributes):
+        for i, compiled_layer in enumerate(self.layers):
+            attr_layer = attributes[i]
+
+            for attribute in compiled_layer.attributes:
+                if attribute.decode_type:
+                    attr_layer[attribute.name] = attribute.decode_type(attr_layer[attribute.name])
+
+        return attributes
+
+    def build_layers(self, values):
+        decoded_layers = []
+
+        for compiled_layer, positions in zip(self.layers, self.layer_positions):
+            decoded_layers.append(compiled_layer.record(*[values[p] for p in positions]))
+
+        return decoded_layers
+
+    def frame_length(self, buffer, offset=0):
+        """
+        Length of the frame starting at offset of buffer, determined from the scheme. Returns None if the buffer does
+        not hold enough bytes to determine the length or to complete the frame. If the length cannot be determined
+        from the head of a frame (scheme is not delimited), the rest of the buffer is considered to be the frame.
+        """
+        available = len(buffer) - offset
+
+        if self.fixed_size is not None:
+            return self.fixed_size if available >= self.fixed_size else None
+
+        if not self.delimited:
+            return available
+
+        view = memoryview(buffer)
+        decoded_layers = [{} for _ in self.layers]
+        position = offset
+        trailer_size = 0
+
+        for attribute in self.frame:
+            size = attribute.size
+
+            if not size:
+                size = attribute.resolve_size(decoded_layers)
+
+            if attribute.trailer:
+                trailer_size += size
+                continue
+
+            if position + size > len(buffer):
+                return None
+
+            if (attribute.layer, attribute.name) in self.requisite_keys:
+                decoded_layers[attribute.layer][attribute.name] = bytes(view[position:position + size])
+
+            position += size
+
+        length = position - offset + trailer_size
+
+        return length if length <= available else None
+
+    def check_input_size(self, input_bytes):
+        if len(input_bytes) < self.fixed_size:
+            raise UnexpectedInputSize(
+                "Size of input received ({}) was smaller than expected by scheme definition ({}).".format(
+                    len(input_bytes), self.fixed_size
+                )
+            )
+
+
+class Segment:
+    def __init__(self, attributes):
+        self.attributes = attributes
+        self.attribute = attributes[0]
+        self.names = tuple(attribute.name for attribute in attributes)
+
+
+def segments(attributes):
+    """
+    Group consecutive attributes of fixed size into segments unpacked by a single struct. Each attribute of variable
+    size forms a segment of its own, whose struct is None.
+    """
+    grouped = []
+    fixed_run = []
+
+    for attribute in attributes:
+        if attribute.size:
+            fixed_run.append(attribute)
+            continue
+
+        if fixed_run:
+            grouped.append(fixed_segment(fixed_run))
+            fixed_run = []
+
+        grouped.append((None, Segment((attribute,))))
+
+    if fixed_run:
+        grouped.append(fixed_segment(fixed_run))
+
+    return tuple(grouped)
+
+
+def fixed_segment(attributes):
+    segment_format = ">" + "".join("{}s".format(attribute.size) for attribute in attributes)
+
+    return Struct(segment_format), Segment(tuple(attributes))
+
+
+def compile_scheme(scheme):
+    return SchemeCodec(scheme)
+
+
+def check_attribute_size(attribute, attr_size):
+    if attr_size == 0:
+        return
+
+    if len(attribute) > attr_size:
+        raise UnexpectedInputSize(
+           "Size of data to be encoded ({}) exceeds defined size ({}).".format(len(attribute), attr_size),
+        )
+    elif len(attribute) < attr_size:
+        raise UnexpectedInputSize(
+            "Data to be encoded is smaller ({}) than expected ({}).".format(len(attribute), attr_size)
+        )
+
+
+def check_buffer_size(buffer, end):
+    if len(buffer) < end:
+        raise UnexpectedInputSize(
+            "Size of buffer ({}) is smaller than size of encoded frame ({}).".format(len(buffer), end)
+        )
+
+
+def type_converters(attribute_scheme):
+    """
+    Resolve type conversion of an attribute to a pair of (encoder, decoder) callables. None is returned in place of
+    identity conversion.
+    """
+    attribute_type = attribute_scheme.get("type")
+    encoding_callback = attribute_scheme.get("encode_type_callback")
+    decoding_callback = attribute_scheme.get("decode_type_callback")
+
+    if (attribute_type == BYTES) or not attribute_type:
+        encoder, decoder = None, None
+    elif attribute_type == INT:
+        size = attribute_scheme.get("size")
+        endianness = attribute_scheme.get("endianness")
+        endianness = endianness if endianness else "big"
+
+        def encoder(data):
+            return data.to_bytes(size, endianness)
+
+        def decoder(data):
+            return int.from_bytes(data, endianness)
+
+    elif attribute_type == STR:
+        encoder, decoder = str.encode, bytes.decode
+    else:
+        encoder, decoder = type_not_recognized, type_not_recognized
+
+    encoder = encoding_callback if encoding_callback else encoder
+    decoder = decoding_callback if decoding_callback else decoder
+
+    return encoder, decoder
+
+
+def struct_code(attribute_scheme):
+    """
+    Struct code of attributes that can be packed natively by the typed struct, None otherwise.
+    """
+    if attribute_scheme.get("type") != INT:
+        return None
+    if attribute_scheme.get("encode_type_callback") or attribute_scheme.get("decode_type_callback"):
+        return None
+    if attribute_scheme.get("endianness") not in (None, "big"):
+        return None
+
+    return NATIVE_INT_CODES.get(attribute_scheme.get("size"))
+
+
+def type_not_recognized(data):
+    raise AttributeTypeNotRecognized
+
+
+def compile_dependencies(codec):
+    """
+    Bind attributes of variable size to their requisite attributes defined by scheme dependencies. Dependencies are
+    validated once: every attribute of variable size needs dependencies, every requisite attribute has to exist, must
+    not depend back on the dependent attribute and has to be decoded before it.
+    """
+    attributes = dict(
+        ((attribute.layer, attribute.name), attribute)
+        for compiled_layer in codec.layers for attribute in compiled_layer.attributes
+    )
+
+    # Order in which attributes are decoded: layers outermost first, headers from the head, trailers from the tail
+    decode_order = {}
+
+    for compiled_layer in reversed(codec.layers):
+        for attribute in compiled_layer.headers + tuple(reversed(compiled_layer.trailers)):
+            decode_order[(attribute.layer, attribute.name)] = len(decode_order)
+
+    variable_attributes = [attribute for attribute in attributes.values() if not attribute.size]
+
+    for attribute in variable_attributes:
+        dependency = codec.dependencies.get(attribute.name)
+        requisites = []
+
+        if not dependency:
+            raise DependencyNotResolvable(
+                "No dependencies defined for attribute {} of variable size.".format(attribute.name)
+            )
+
+        for layer_i, attr_names in dependency.items():
+            for attr_name in attr_names:
+                if (layer_i, attr_name) not in attributes:
+                    raise DependencyNotResolvable(
+                        "Attribute {} depends on attribute {} not defined in layer {}.".format(
+                            attribute.name, attr_name, layer_i
+                        )
+                    )
+
+                requisites.append((layer_i, attr_name))
+
+        attribute.requisites = tuple(requisites)
+
+    for attribute in variable_attributes:
+        check_cycle(attribute, attributes, [])
+
+        for requisite in attribute.requisites:
+            if decode_order[requisite] > decode_order[(attribute.layer, attribute.name)]:
+                raise DependencyNotResolvable(
+                    "Attribute {} depends on attribute {} of layer {}, which is decoded after it.".format(
+                        attribute.name, requisite[1], requisite[0]
+                    )
+                )
+
+
+def check_cycle(attribute, attributes, path):
+    key = (attribute.layer, attribute.name)
+
+    if key in path:
+        raise DependencyNotResolvable(
+            "Cyclic dependency: {}.".format(" -> ".join(name for layer_i, name in path + [key]))
+        )
+
+    for requisite in attribute.requisites:
+        requisite_attribute = attributes[requisite]
+
+        if not requisite_attribute.size:
+            check_cycle(requisite_attribute, attributes, path + [key])
+
+
+def default_callback(*args):
+    return int.from_bytes(args[0], "big")
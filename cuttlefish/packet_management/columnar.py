@@ -0,0 +1,173 @@
+from .errors import SchemeNotFixedSize, UnexpectedInputSize
+from .scheme import INT
+from .codec import SchemeCodec, compile_scheme
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Column kinds
+NATIVE = 0
+COMBINED = 1
+RAW = 2
+
+
+class ColumnarDecoder:
+    """
+    ColumnarDecoder decodes batches of equal-length frames of a fixed layout (no attribute of size 0) into columns,
+    one numpy array per attribute. It is meant for offline processing of captured frames, where decoding packets one
+    by one dominates.
+
+    A structured dtype is built from the compiled scheme, frames are viewed as a record array and every attribute is
+    returned as a column:
+
+        integer of size 1, 2, 4, 8  |  unsigned integer column of the endianness defined by scheme
+        integer of other size       |  uint64 column combined from individual bytes
+        other types                 |  uint8 column of shape (N, size) holding raw byte data
+
+    Decoding callbacks (eg. security measures) are not applied. Frames may start with leading bytes not described by
+    the scheme (eg. channel id), which are skipped by setting offset. Bytes following the scheme are ignored.
+
+    Columns can be converted back into per packet layer records with to_layers, applying type conversion defined by
+    scheme.
+    """
+
+    def __init__(self, scheme, offset=0):
+        if numpy is None:
+            raise ImportError("ColumnarDecoder requires numpy")
+
+        self.codec = scheme if isinstance(scheme, SchemeCodec) else compile_scheme(scheme)
+
+        if self.codec.fixed_size is None:
+            raise SchemeNotFixedSize("Columnar decoding requires a scheme without attributes of variable size.")
+
+        self.offset = offset
+        self.min_frame_size = offset + self.codec.fixed_size
+
+        self.fields = []
+        field_offset = offset
+
+        for attribute in self.codec.frame:
+            field_name = "{}_{}".format(attribute.layer, attribute.index)
+            field_format, kind = field_type(attribute)
+
+            self.fields.append((field_name, field_format, field_offset, attribute, kind))
+            field_offset += attribute.size
+
+    def dtype(self, frame_size):
+        return numpy.dtype({
+            "names": [field[0] for field in self.fields],
+            "formats": [field[1] for field in self.fields],
+            "offsets": [field[2] for field in self.fields],
+            "itemsize": frame_size,
+        })
+
+    def decode(self, frames, frame_size=None):
+        """
+        Decode frames into columns. frames is either a list of equal-length frames or a single buffer of concatenated
+        frames of frame_size bytes each. Returns a list of {attribute name: column} dictionaries, one per layer.
+        """
+        if isinstance(frames, (bytes, bytearray, memoryview)):
+            buffer = frames
+            frame_size = frame_size if frame_size else self.min_frame_size
+        else:
+            frame_size = frame_size if frame_size else (len(frames[0]) if frames else self.min_frame_size)
+
+            for frame in frames:
+                if len(frame) != frame_size:
+                    raise UnexpectedInputSize(
+                        "Columnar decoding requires frames of equal size ({}), received {}.".format(
+                            frame_size, len(frame)
+                        )
+                    )
+
+            buffer = b"".join(frames)
+
+        if frame_size < self.min_frame_size:
+            raise UnexpectedInputSize(
+                "Size of input received ({}) was smaller than expected by scheme definition ({}).".format(
+                    frame_size, self.min_frame_size
+                )
+            )
+
+        records = numpy.frombuffer(buffer, dtype=self.dtype(frame_size), count=len(buffer) // frame_size)
+        columns = [{} for _ in self.codec.layers]
+
+        for field_name, field_format, field_offset, attribute, kind in self.fields:
+            column = records[field_name]
+
+            if kind == COMBINED:
+                column = combine_bytes(column, attribute.scheme.get("endianness"))
+
+            columns[attribute.layer][attribute.name] = column
+
+        return columns
+
+    def to_layers(self, columns):
+        """
+        Convert columns into per packet lists of layers, as returned by Serializer.decode.
+        """
+        layer_values = []
+
+        for compiled_layer, layer_columns in zip(self.codec.layers, columns):
+            values = []
+
+            for attribute in compiled_layer.attributes:
+                values.append(column_values(layer_columns[attribute.name], attribute))
+
+            layer_values.append((compiled_layer.record, values))
+
+        packet_count = len(layer_values[0][1][0]) if layer_values and layer_values[0][1] else 0
+        packets = []
+
+        for i in range(packet_count):
+            packets.append([record(*[value[i] for value in values]) for record, values in layer_values])
+
+        return packets
+
+    def decode_layers(self, frames, frame_size=None):
+        return self.to_layers(self.decode(frames, frame_size=frame_size))
+
+
+def field_type(attribute):
+    size = attribute.size
+    scheme = attribute.scheme
+
+    if (scheme.get("type") == INT) and not scheme.get("decode_type_callback"):
+        byte_order = "<" if scheme.get("endianness") == "little" else ">"
+
+        if size in (1, 2, 4, 8):
+            return "{}u{}".format(byte_order, size), NATIVE
+        if size < 8:
+            return ("u1", (size,)), COMBINED
+
+    return ("u1", (size,)), RAW
+
+
+def combine_bytes(column, endianness=None):
+    size = column.shape[1]
+    combined = numpy.zeros(column.shape[0], dtype=numpy.uint64)
+
+    for i in range(size):
+        shift = (8 * i) if endianness == "little" else (8 * (size - 1 - i))
+        combined |= column[:, i].astype(numpy.uint64) << numpy.uint64(shift)
+
+    return combined
+
+
+def column_values(column, attribute):
+    if column.ndim == 1:
+        return column.tolist()
+
+    size = attribute.size
+    raw = numpy.ascontiguousarray(column).tobytes()
+    values = [raw[i:i + size] for i in range(0, len(raw), size)]
+
+    decoder = attribute.decode_type
+
+    if decoder:
+        values = [decoder(value) for value in values]
+
+    return values
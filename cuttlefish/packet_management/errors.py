@@ -36,3 +36,19 @@ class RedundantBytesReceived(Exception):
     """
 
     pass
+
+
+class SchemeNotFixedSize(Exception):
+    """
+    Raised when an operation requiring a fixed frame layout is used with a scheme containing attributes of variable size
+    """
+
+    pass
+
+
+class DependencyNotResolvable(Exception):
+    """
+    Raised when a dependency of an attribute of variable size is missing, cyclic or not decoded before the attribute
+    """
+
+    pass
@@ -0,0 +1,301 @@
+class Record:
+    """
+    Base class of layer records. A record class is generated for every layer of a compiled scheme by record_class;
+    each attribute of the layer is stored in a slot of its own, in scheme order.
+
+    Records provide the subset of dictionary interface used by network primitives and security measures: access by
+    attribute name or position, get, update, pop, keys, values and items. Attributes can only be set if defined by
+    the scheme. Popped attributes are removed from the record and can be set again later, in which case they are
+    moved to the end as in a dictionary.
+    """
+
+    __slots__ = ("_live",)
+
+    _fields = ()
+    _slots = ()
+    _index = {}
+
+    def __init__(self, *values):
+        self._live = None
+
+        for slot, value in zip(self._slots, values):
+            setattr(self, slot, value)
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Build a record from (name, value) pairs, eg. of a record decoded in another process.
+        """
+        record = cls()
+        live = []
+
+        for key, value in items:
+            setattr(record, record._index[key], value)
+            live.append(key)
+
+        if tuple(live) != record._fields:
+            record._live = live
+
+        return record
+
+    def live_fields(self):
+        return self._fields if self._live is None else self._live
+
+    def pop(self, key=None):
+        if key is None:
+            key = self.live_fields()[-1]
+
+        value = self[key]
+
+        self.__delitem__(key)
+
+        return value
+
+    def get(self, key, default=None):
+        slot = self._index.get(key)
+
+        if slot is None:
+            return default
+
+        return getattr(self, slot, default)
+
+    def update(self, update_dict):
+        if isinstance(update_dict, dict):
+            update_dict = update_dict.items()
+
+        for key, value in update_dict:
+            self.__setitem__(key, value)
+
+    def keys(self):
+        return list(self.live_fields())
+
+    def values(self):
+        return [getattr(self, self._index[key]) for key in self.live_fields()]
+
+    def items(self):
+        return [(key, getattr(self, self._index[key])) for key in self.live_fields()]
+
+    def __contains__(self, key):
+        return key in self.live_fields()
+
+    def __delitem__(self, key):
+        try:
+            delattr(self, self._index[key])
+        except AttributeError:
+            raise KeyError(key)
+
+        self._live = [field for field in self.live_fields() if field != key]
+
+    def __eq__(self, other):
+        try:
+            return self.items() == list(other.items())
+        except AttributeError:
+            return False
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            key = self.live_fields()[key]
+
+        try:
+            return getattr(self, self._index[key])
+        except AttributeError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.live_fields())
+
+    def __len__(self):
+        return len(self.live_fields())
+
+    def __repr__(self):
+        repr_string = "Record{"
+        repr_string += ", ".join([(str(k) + ": " + str(v)) for k, v in self.items()])
+        repr_string += "}"
+
+        return repr_string
+
+    def __reversed__(self):
+        return reversed(self.live_fields())
+
+    def __setitem__(self, key, value):
+        if isinstance(key, int):
+            key = self.live_fields()[key]
+
+        slot = self._index.get(key)
+
+        if slot is None:
+            raise KeyError("Attribute {} is not defined by layer scheme.".format(key))
+
+        if (self._live is not None) and (key not in self._live):
+            self._live.append(key)
+
+        setattr(self, slot, value)
+
+
+class LazyRecord(Record):
+    """
+    Record of a layer decoded lazily. Instead of byte data, the record holds a memoryview of the frame and offsets of
+    its attributes; an attribute is sliced from the frame, and type converted, only when it is accessed.
+
+    Until typed() is called (ie. while decoding callbacks such as security measures are applied), accessed attributes
+    hold byte data. Afterwards, each attribute is converted by decoder defined by scheme on first access.
+    """
+
+    __slots__ = ("_frame", "_offsets", "_loaded", "_converted", "_typed")
+
+    _decoders = ()
+    _positions = {}
+
+    def __init__(self, frame, offsets):
+        self._live = None
+        self._frame = frame
+        self._offsets = offsets
+        # Bit masks of attributes (by position) held in their slot and converted by their decoder respectively
+        self._loaded = 0
+        self._converted = 0
+        self._typed = False
+
+    def typed(self):
+        self._typed = True
+
+    def load(self, key):
+        if isinstance(key, int):
+            key = self.live_fields()[key]
+
+        position = self._positions[key]
+
+        if (self._live is not None) and (key not in self._live):
+            raise KeyError(key)
+
+        return self.load_position(position)
+
+    def load_position(self, position):
+        bit = 1 << position
+
+        # Converted value is kept in the slot, later accesses only read it
+        if self._converted & bit:
+            return getattr(self, self._slots[position])
+
+        if self._loaded & bit:
+            value = getattr(self, self._slots[position])
+        else:
+            start, size = self._offsets[position]
+            value = bytes(self._frame[start:start + size])
+            self._loaded |= bit
+
+        if self._typed:
+            decoder = self._decoders[position]
+            value = decoder(value) if decoder else value
+
+            self._converted |= bit
+
+        setattr(self, self._slots[position], value)
+
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self.load(key)
+        except KeyError:
+            return default
+
+    def values(self):
+        if (self._live is None) and (not self._loaded) and self._typed:
+            return self.load_all()
+
+        if self._live is None:
+            return [self.load_position(position) for position in range(len(self._fields))]
+
+        return [self.load(key) for key in self._live]
+
+    def items(self):
+        return list(zip(self.live_fields(), self.values()))
+
+    def load_all(self):
+        """
+        Slice and convert all attributes in a single pass, when none has been accessed yet.
+        """
+        frame = self._frame
+        values = []
+
+        for slot, (start, size), decoder in zip(self._slots, self._offsets, self._decoders):
+            value = bytes(frame[start:start + size])
+            value = decoder(value) if decoder else value
+
+            setattr(self, slot, value)
+            values.append(value)
+
+        self._loaded = self._converted = (1 << len(values)) - 1
+
+        return values
+
+    def __delitem__(self, key):
+        if (key not in self._index) or ((self._live is not None) and (key not in self._live)):
+            raise KeyError(key)
+
+        try:
+            delattr(self, self._index[key])
+        except AttributeError:
+            pass
+
+        bit = 1 << self._positions[key]
+        self._loaded &= ~bit
+        self._converted &= ~bit
+
+        self._live = [field for field in self.live_fields() if field != key]
+
+    def __getitem__(self, key):
+        return self.load(key)
+
+    def __repr__(self):
+        repr_string = "LazyRecord{"
+        repr_string += ", ".join([(str(k) + ": " + str(v)) for k, v in self.items()])
+        repr_string += "}"
+
+        return repr_string
+
+    def __setitem__(self, key, value):
+        if isinstance(key, int):
+            key = self.live_fields()[key]
+
+        Record.__setitem__(self, key, value)
+
+        bit = 1 << self._positions[key]
+        self._loaded |= bit
+
+        # Values set after type conversion are not converted again
+        if self._typed:
+            self._converted |= bit
+
+
+def record_class(names, name="Record"):
+    """
+    Generate a record class with a slot for each of the attribute names.
+    """
+    names = tuple(names)
+    slots = tuple("_{}".format(i) for i in range(len(names)))
+
+    return type(name, (Record,), {
+        "__slots__": slots,
+        "_fields": names,
+        "_slots": slots,
+        "_index": dict(zip(names, slots)),
+    })
+
+
+def lazy_record_class(names, decoders, name="LazyRecord"):
+    """
+    Generate a lazy record class with a slot for each of the attribute names. decoders holds type decoders of
+    attributes in the same order, None in place of identity conversion.
+    """
+    names = tuple(names)
+    slots = tuple("_{}".format(i) for i in range(len(names)))
+
+    return type(name, (LazyRecord,), {
+        "__slots__": slots,
+        "_fields": names,
+        "_slots": slots,
+        "_index": dict(zip(names, slots)),
+        "_decoders": tuple(decoders),
+        "_positions": dict((field, i) for i, field in enumerate(names)),
+    })
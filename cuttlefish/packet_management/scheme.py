@@ -49,7 +49,9 @@ class Scheme:
             (1, 5): (0: ("size", "count")),
         }
 
-    For nested schemes, dependencies can be only defined for attributes within the same level.
+    For nested schemes, dependencies can be only defined for attributes within the same level or an outer level, as
+    these are decoded first. Dependencies are validated when the scheme is compiled by the serializer: a missing,
+    cyclic or not yet decoded requisite attribute raises DependencyNotResolvable.
 
     """
 
@@ -1,2 +1,5 @@
 from .ring_buffer import *
+from .spsc import *
+from .byte_ring import *
+from .signal import *
 from .errors import *
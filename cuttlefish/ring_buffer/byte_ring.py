@@ -0,0 +1,195 @@
+from .errors import *
+from .signal import Signal, ticks_us, ticks_diff
+
+import _thread
+
+
+FRAME_PREFIX_SIZE = 2
+# Length prefix marking the rest of the arena as unused, next frame starts at the beginning
+WRAP_MARKER = 0xFFFF
+MAX_FRAME_SIZE = WRAP_MARKER - 1
+
+
+class ByteRing:
+    """
+    ByteRing stores frames (eg. packets to be sent) in a single preallocated bytearray of capacity bytes, so that
+    memory used by a queue is bounded by bytes rather than by number of frames and no object is kept per frame.
+
+    Every frame is stored contiguously, preceded by its length (FRAME_PREFIX_SIZE bytes, big endian). A frame that
+    does not fit before the end of the arena is written at its beginning; the bytes skipped are marked by
+    WRAP_MARKER (or left unmarked if there is no room for a prefix).
+
+    read_frame returns a memoryview of the frame in the arena, which stays valid until the next read_frame (or
+    release) call; only then is its space given back to writers.
+
+    push, pop, clear and current_size provide the interface of RingBuffer for single frames. A full ring raises
+    RingBufferOverflow.
+    """
+
+    def __init__(self, capacity):
+        if capacity <= FRAME_PREFIX_SIZE:
+            raise BufferSizeNotAllowed
+
+        self.capacity = capacity
+        self.arena = bytearray(capacity)
+        self.view = memoryview(self.arena)
+
+        self.head = 0
+        self.tail = 0
+        # Bytes taken by frames, their prefixes and skipped ends of arena
+        self.used = 0
+        # Bytes of the frame last read and where the next frame starts, released on next read
+        self.pending = 0
+        self.pending_head = 0
+        self.current_size = 0
+
+        self.lock = _thread.allocate_lock()
+        self.item_signal = None
+
+        self.stats = {"overflows": 0}
+
+    def __repr__(self):
+        return "ByteRing({} frames, {}/{} bytes)".format(self.current_size, self.used, self.capacity)
+
+    def write_frame(self, frame):
+        """
+        Copy frame (any object supporting the buffer protocol) into the ring.
+        """
+        size = len(frame)
+        required = FRAME_PREFIX_SIZE + size
+
+        if size > MAX_FRAME_SIZE:
+            raise FrameSizeNotAllowed(
+                "Frame of {} bytes exceeds maximal frame size ({}).".format(size, MAX_FRAME_SIZE)
+            )
+
+        with self.lock:
+            start = self.reserve(required)
+
+            if start is None:
+                self.stats["overflows"] += 1
+                raise RingBufferOverflow
+
+            self.arena[start:start + FRAME_PREFIX_SIZE] = size.to_bytes(FRAME_PREFIX_SIZE, "big")
+            self.arena[start + FRAME_PREFIX_SIZE:start + required] = frame
+
+            self.tail = start + required
+            self.used += required
+            self.current_size += 1
+
+        if self.item_signal:
+            self.item_signal.set()
+
+        return size
+
+    def reserve(self, required):
+        """
+        Return start of a contiguous free region of required bytes, wrapping around if needed, or None.
+        """
+        capacity = self.capacity
+        head = self.head
+        tail = self.tail
+
+        if (tail > head) or (self.used == 0):
+            if (capacity - tail) >= required:
+                return tail
+
+            if head < required:
+                return None
+
+            # Skip the end of arena
+            if (capacity - tail) >= FRAME_PREFIX_SIZE:
+                self.arena[tail:tail + FRAME_PREFIX_SIZE] = WRAP_MARKER.to_bytes(FRAME_PREFIX_SIZE, "big")
+
+            self.used += capacity - tail
+
+            return 0
+
+        if (head - tail) >= required:
+            return tail
+
+        return None
+
+    def read_frame(self, timeout=0):
+        """
+        Return a memoryview of the oldest frame. If the ring is empty, RingBufferUnderflow is raised right away, or
+        once timeout (in seconds) expires; None waits indefinitely.
+        """
+        if timeout != 0:
+            self.wait_frame(timeout)
+
+        with self.lock:
+            self.release_pending()
+
+            if not self.current_size:
+                raise RingBufferUnderflow
+
+            head = self.head
+
+            if ((head + FRAME_PREFIX_SIZE) > self.capacity) or (
+                int.from_bytes(self.arena[head:head + FRAME_PREFIX_SIZE], "big") == WRAP_MARKER
+            ):
+                self.used -= self.capacity - head
+                head = 0
+
+            size = int.from_bytes(self.arena[head:head + FRAME_PREFIX_SIZE], "big")
+            start = head + FRAME_PREFIX_SIZE
+
+            self.head = head
+            self.pending = FRAME_PREFIX_SIZE + size
+            self.pending_head = start + size
+            self.current_size -= 1
+
+            return self.view[start:start + size]
+
+    def wait_frame(self, timeout):
+        start = ticks_us()
+
+        while not self.current_size:
+            if not self.item_signal:
+                self.item_signal = Signal()
+                continue
+
+            if timeout is None:
+                self.item_signal.wait()
+                continue
+
+            remaining = timeout - ticks_diff(ticks_us(), start) / 1000000
+
+            if (remaining <= 0) or not self.item_signal.wait(remaining):
+                raise RingBufferUnderflow
+
+    def release(self):
+        """
+        Give space of the frame last read back to writers, invalidating its memoryview.
+        """
+        with self.lock:
+            self.release_pending()
+
+    def release_pending(self):
+        if self.pending:
+            self.used -= self.pending
+            self.head = self.pending_head
+            self.pending = 0
+
+        if not self.used:
+            self.head = 0
+            self.tail = 0
+
+    def push(self, *frames, blocking=True):
+        for frame in frames:
+            self.write_frame(frame)
+
+        return len(frames)
+
+    def pop(self, timeout=0):
+        return self.read_frame(timeout)
+
+    def clear(self):
+        with self.lock:
+            self.head = 0
+            self.tail = 0
+            self.used = 0
+            self.pending = 0
+            self.pending_head = 0
+            self.current_size = 0
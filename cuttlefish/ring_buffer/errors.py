@@ -20,3 +20,19 @@ class BufferSizeNotAllowed(Exception):
     """
 
     pass
+
+
+class OverflowPolicyNotRecognized(Exception):
+    """
+    Raised when overflow policy specified is not one of the policies defined
+    """
+
+    pass
+
+
+class FrameSizeNotAllowed(Exception):
+    """
+    Raised when a frame is too large to be stored in a byte ring
+    """
+
+    pass
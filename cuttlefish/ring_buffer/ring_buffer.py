@@ -1,13 +1,46 @@
 from .errors import *
+from .signal import Signal, ticks_us, ticks_diff
 
 import _thread
 
 
+# Overflow policies
+RAISE = "raise"
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+GROW = "grow"
+
+OVERFLOW_POLICIES = (RAISE, DROP_NEWEST, DROP_OLDEST, BLOCK, GROW)
+
+
 class RingBuffer:
-    def __init__(self, max_size):
+    """
+    First in, first out buffer of max_size items. What happens when items are pushed to a full buffer is defined by
+    overflow policy:
+
+        RAISE        |  RingBufferOverflow is raised and no item is pushed (default)
+        DROP_NEWEST  |  items that do not fit are dropped
+        DROP_OLDEST  |  oldest items are overwritten
+        BLOCK        |  push waits up to timeout seconds (None waits indefinitely) for items to be popped, then
+                        raises RingBufferOverflow
+        GROW         |  buffer doubles its size up to max_capacity items (8 * max_size by default), then raises
+                        RingBufferOverflow
+
+    push returns number of items pushed. How often each policy took effect is counted in stats: overflows (raised),
+    dropped_newest and dropped_oldest (items), blocked (pushes that had to wait), timeouts and grown (resizes).
+
+    Consumers can wait for items with pop(timeout) instead of polling, and take bursts of items under a single lock
+    acquisition with pop_many and drain.
+    """
+
+    def __init__(self, max_size, overflow=RAISE, timeout=None, max_capacity=None):
         if max_size < 1:
             raise BufferSizeNotAllowed
 
+        if overflow not in OVERFLOW_POLICIES:
+            raise OverflowPolicyNotRecognized("Overflow policy {} is not recognized.".format(overflow))
+
         self.max_size = max_size
         self.current_size = 0
 
@@ -17,32 +50,245 @@ class RingBuffer:
 
         self.lock = _thread.allocate_lock()
 
+        self.overflow = overflow
+        self.timeout = timeout
+        self.max_capacity = max_capacity if max_capacity else 8 * max_size
+        # Wakes producers blocked on a full buffer
+        self.space_signal = Signal() if overflow == BLOCK else None
+        # Wakes consumers waiting in pop, created on first pop with timeout
+        self.item_signal = None
+
+        self.stats = {"overflows": 0, "dropped_newest": 0, "dropped_oldest": 0, "blocked": 0, "timeouts": 0,
+                      "grown": 0}
+
     def __repr__(self):
         return str(self.buffer)
 
-    def push(self, *args):
+    def push(self, *args, blocking=True):
+        """
+        Push items to the buffer. If blocking is not set, buffer with BLOCK policy raises RingBufferOverflow right
+        away instead of waiting (eg. when called by the consumer itself).
+        """
+        if (self.overflow == BLOCK) and blocking:
+            pushed = self.push_blocking(args)
+        else:
+            pushed = self.push_locked(args)
+
+        if self.item_signal and pushed:
+            self.item_signal.set()
+
+        return pushed
+
+    def push_many(self, items):
+        """
+        Push items from a sequence until buffer is full. Returns number of items pushed; items that do not fit are
+        left to the caller. Never raises or blocks on a full buffer; buffers with DROP_OLDEST and GROW policy
+        overwrite and grow as in push.
+        """
         with self.lock:
-            if (self.current_size + len(args)) > self.max_size:
-                raise RingBufferOverflow
+            if self.overflow == DROP_OLDEST:
+                self.append_overwrite(items)
+                pushed = len(items)
+            else:
+                free = self.max_size - self.current_size
+
+                if (len(items) > free) and (self.overflow == GROW):
+                    self.grow(min(self.current_size + len(items), self.max_capacity))
+                    free = self.max_size - self.current_size
 
-            for arg in args:
-                self.tail = (self.tail + 1) % self.max_size
-                self.buffer[self.tail] = arg
+                pushed = min(len(items), free)
+                self.append(items[:pushed])
 
-                self.current_size += 1
+        if self.item_signal and pushed:
+            self.item_signal.set()
 
-    def pop(self):
+        return pushed
+
+    def push_locked(self, args):
         with self.lock:
-            if self.current_size == 0:
+            free = self.max_size - self.current_size
+
+            if len(args) <= free:
+                self.append(args)
+                return len(args)
+
+            if self.overflow == DROP_NEWEST:
+                self.stats["dropped_newest"] += len(args) - free
+                self.append(args[:free])
+
+                return free
+
+            if self.overflow == DROP_OLDEST:
+                self.append_overwrite(args)
+                return len(args)
+
+            if (self.overflow == GROW) and self.grow(self.current_size + len(args)):
+                self.append(args)
+                return len(args)
+
+            self.stats["overflows"] += 1
+
+            raise RingBufferOverflow
+
+    def push_blocking(self, args):
+        start = ticks_us()
+        blocked = False
+
+        while True:
+            with self.lock:
+                free = self.max_size - self.current_size
+
+                if len(args) <= free:
+                    self.append(args)
+
+                    # Let another blocked producer try as well
+                    if blocked and (free > len(args)):
+                        self.space_signal.set()
+
+                    return len(args)
+
+                if len(args) > self.max_size:
+                    self.stats["overflows"] += 1
+                    raise RingBufferOverflow
+
+            if not blocked:
+                blocked = True
+                self.stats["blocked"] += 1
+
+            if self.timeout is None:
+                self.space_signal.wait()
+                continue
+
+            remaining = self.timeout - ticks_diff(ticks_us(), start) / 1000000
+
+            if (remaining <= 0) or not self.space_signal.wait(remaining):
+                self.stats["timeouts"] += 1
+                raise RingBufferOverflow
+
+    def pop(self, timeout=0):
+        """
+        Pop the oldest item. If buffer is empty, RingBufferUnderflow is raised right away, or once timeout (in
+        seconds) expires without an item being pushed; None waits indefinitely.
+        """
+        if timeout == 0:
+            with self.lock:
+                if self.current_size == 0:
+                    raise RingBufferUnderflow
+
+                result = self.take()
+        else:
+            result = self.pop_waiting(timeout)
+
+        if self.space_signal:
+            self.space_signal.set()
+
+        return result
+
+    def pop_waiting(self, timeout):
+        start = ticks_us()
+
+        while True:
+            with self.lock:
+                if self.current_size:
+                    result = self.take()
+
+                    # Let another waiting consumer take the remaining items
+                    if self.current_size and self.item_signal:
+                        self.item_signal.set()
+
+                    return result
+
+                if not self.item_signal:
+                    self.item_signal = Signal()
+
+            if timeout is None:
+                self.item_signal.wait()
+                continue
+
+            remaining = timeout - ticks_diff(ticks_us(), start) / 1000000
+
+            if (remaining <= 0) or not self.item_signal.wait(remaining):
                 raise RingBufferUnderflow
 
-            result = self.buffer[self.head]
-            self.buffer[self.head] = None
-            self.head = (self.head + 1) % self.max_size
+    def pop_many(self, count):
+        """
+        Pop up to count oldest items under a single lock acquisition. Returns a list of items, empty if buffer is
+        empty.
+        """
+        with self.lock:
+            items = [self.take() for _ in range(min(count, self.current_size))]
+
+        if self.space_signal and items:
+            self.space_signal.set()
+
+        return items
+
+    def drain(self):
+        """
+        Pop all items.
+        """
+        return self.pop_many(self.max_size)
+
+    def take(self):
+        result = self.buffer[self.head]
+        self.buffer[self.head] = None
+        self.head = (self.head + 1) % self.max_size
 
-            self.current_size -= 1
+        self.current_size -= 1
 
-            return result
+        return result
 
     def clear(self):
-        self.buffer = [None] * self.max_size
+        with self.lock:
+            self.buffer = [None] * self.max_size
+            self.head = 0
+            self.tail = -1
+            self.current_size = 0
+
+        if self.space_signal:
+            self.space_signal.set()
+
+    def append(self, items):
+        for item in items:
+            self.tail = (self.tail + 1) % self.max_size
+            self.buffer[self.tail] = item
+
+            self.current_size += 1
+
+    def append_overwrite(self, items):
+        for item in items:
+            if self.current_size == self.max_size:
+                self.head = (self.head + 1) % self.max_size
+                self.current_size -= 1
+                self.stats["dropped_oldest"] += 1
+
+            self.tail = (self.tail + 1) % self.max_size
+            self.buffer[self.tail] = item
+
+            self.current_size += 1
+
+    def grow(self, required_size):
+        if required_size > self.max_capacity:
+            return False
+
+        new_size = self.max_size
+
+        while new_size < required_size:
+            new_size *= 2
+
+        new_size = min(new_size, self.max_capacity)
+
+        # Already as large as it can or needs to be
+        if new_size == self.max_size:
+            return required_size <= self.max_size
+
+        items = [self.buffer[(self.head + i) % self.max_size] for i in range(self.current_size)]
+
+        self.buffer = items + [None] * (new_size - self.current_size)
+        self.head = 0
+        self.tail = self.current_size - 1
+        self.max_size = new_size
+
+        self.stats["grown"] += 1
+
+        return True
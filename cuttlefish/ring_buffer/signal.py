@@ -0,0 +1,57 @@
+import _thread
+
+try:
+    from time import ticks_us, ticks_ms, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_ms():
+        return int(perf_counter() * 1000)
+
+    def ticks_diff(end, start):
+        return end - start
+
+
+class Signal:
+    """
+    Signal wakes up a thread waiting for work (eg. tasks pushed to a ring buffer) without polling. Only primitives of
+    _thread are used, so that it is available on MicroPython: a lock is held for as long as no signal is pending and
+    released by set, which lets a single waiting thread through.
+
+    Signals do not count: several calls of set before wait wake the waiting thread only once. The waiting thread is
+    expected to consume all available work after waking up.
+    """
+
+    def __init__(self):
+        self.lock = _thread.allocate_lock()
+        self.lock.acquire()
+
+        self.pending_lock = _thread.allocate_lock()
+        self.pending = False
+
+    def set(self):
+        with self.pending_lock:
+            if not self.pending:
+                self.pending = True
+                self.lock.release()
+
+    def wait(self, timeout=None):
+        """
+        Block until signal is set or timeout (in seconds) expires. Returns True if signal was set.
+        """
+        if timeout is None:
+            acquired = self.lock.acquire()
+        else:
+            acquired = self.lock.acquire(1, timeout)
+
+        if acquired:
+            with self.pending_lock:
+                self.pending = False
+
+        return acquired
+
+    def is_set(self):
+        return self.pending
@@ -0,0 +1,178 @@
+from .errors import *
+from .ring_buffer import RAISE, DROP_NEWEST, BLOCK
+from .signal import Signal, ticks_us, ticks_diff
+
+
+SPSC_OVERFLOW_POLICIES = (RAISE, DROP_NEWEST, BLOCK)
+
+
+class SPSCRingBuffer:
+    """
+    Ring buffer with the interface of RingBuffer for exactly one producer and one consumer thread. Producer only
+    advances write index and consumer only advances read index, so that pushing and popping takes no lock. Indices
+    run modulo 2 * max_size, which tells a full buffer from an empty one without a shared counter.
+
+    Overwriting (DROP_OLDEST) and resizing (GROW) would have producer move consumer's index, so only RAISE,
+    DROP_NEWEST and BLOCK overflow policies are supported. Blocked producer and waiting consumer are woken by
+    signals as in RingBuffer.
+    """
+
+    def __init__(self, max_size, overflow=RAISE, timeout=None, max_capacity=None):
+        if max_size < 1:
+            raise BufferSizeNotAllowed
+
+        if overflow not in SPSC_OVERFLOW_POLICIES:
+            raise OverflowPolicyNotRecognized(
+                "Overflow policy {} is not supported by single producer, single consumer buffer.".format(overflow)
+            )
+
+        self.max_size = max_size
+        self.buffer = [None] * max_size
+
+        self.write_index = 0
+        self.read_index = 0
+        self.index_range = 2 * max_size
+
+        self.overflow = overflow
+        self.timeout = timeout
+        self.max_capacity = max_size
+        self.space_signal = Signal() if overflow == BLOCK else None
+        self.item_signal = None
+
+        self.stats = {"overflows": 0, "dropped_newest": 0, "dropped_oldest": 0, "blocked": 0, "timeouts": 0,
+                      "grown": 0}
+
+    def __repr__(self):
+        return str(self.buffer)
+
+    @property
+    def current_size(self):
+        return (self.write_index - self.read_index) % self.index_range
+
+    def push(self, *args, blocking=True):
+        if (self.overflow == BLOCK) and blocking:
+            pushed = self.push_blocking(args)
+        else:
+            free = self.max_size - self.current_size
+
+            if len(args) > free:
+                if self.overflow != DROP_NEWEST:
+                    self.stats["overflows"] += 1
+                    raise RingBufferOverflow
+
+                self.stats["dropped_newest"] += len(args) - free
+                args = args[:free]
+
+            self.append(args)
+            pushed = len(args)
+
+        if self.item_signal and pushed:
+            self.item_signal.set()
+
+        return pushed
+
+    def push_many(self, items):
+        pushed = min(len(items), self.max_size - self.current_size)
+        self.append(items[:pushed])
+
+        if self.item_signal and pushed:
+            self.item_signal.set()
+
+        return pushed
+
+    def push_blocking(self, args):
+        if len(args) > self.max_size:
+            self.stats["overflows"] += 1
+            raise RingBufferOverflow
+
+        start = ticks_us()
+        blocked = False
+
+        while (self.max_size - self.current_size) < len(args):
+            if not blocked:
+                blocked = True
+                self.stats["blocked"] += 1
+
+            if self.timeout is None:
+                self.space_signal.wait()
+                continue
+
+            remaining = self.timeout - ticks_diff(ticks_us(), start) / 1000000
+
+            if (remaining <= 0) or not self.space_signal.wait(remaining):
+                self.stats["timeouts"] += 1
+                raise RingBufferOverflow
+
+        self.append(args)
+
+        return len(args)
+
+    def pop(self, timeout=0):
+        if self.write_index == self.read_index:
+            if timeout == 0:
+                raise RingBufferUnderflow
+
+            self.wait_item(timeout)
+
+        result = self.take()
+
+        if self.space_signal:
+            self.space_signal.set()
+
+        return result
+
+    def wait_item(self, timeout):
+        start = ticks_us()
+
+        while self.write_index == self.read_index:
+            # Producer may have pushed before seeing the signal; check again once it exists
+            if not self.item_signal:
+                self.item_signal = Signal()
+                continue
+
+            if timeout is None:
+                self.item_signal.wait()
+                continue
+
+            remaining = timeout - ticks_diff(ticks_us(), start) / 1000000
+
+            if (remaining <= 0) or not self.item_signal.wait(remaining):
+                raise RingBufferUnderflow
+
+    def pop_many(self, count):
+        items = [self.take() for _ in range(min(count, self.current_size))]
+
+        if self.space_signal and items:
+            self.space_signal.set()
+
+        return items
+
+    def drain(self):
+        return self.pop_many(self.max_size)
+
+    def clear(self):
+        """
+        Drop all items. Like pop, called by consumer.
+        """
+        self.drain()
+
+    def append(self, items):
+        buffer = self.buffer
+        max_size = self.max_size
+        write_index = self.write_index
+
+        for item in items:
+            buffer[write_index % max_size] = item
+
+            # Publish every item as soon as it is stored
+            write_index = (write_index + 1) % self.index_range
+            self.write_index = write_index
+
+    def take(self):
+        position = self.read_index % self.max_size
+
+        result = self.buffer[position]
+        self.buffer[position] = None
+        self.read_index = (self.read_index + 1) % self.index_range
+
+        return result
@@ -1,2 +1,9 @@
 from .scheduler import *
 from .modes import *
+from .stream import *
+from .reactor import *
+from .aio import *
+from .timer import *
+from .aggregation import *
+from .duty_cycle import *
+from .priority import *
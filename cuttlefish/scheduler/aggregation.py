@@ -0,0 +1,71 @@
+# Several frames (channel id followed by packet bytes) can be sent in a single transmission as a super-frame:
+#
+#   AGGREGATE_CHANNEL_ID | number of frames | length of frame 1 | frame 1 | length of frame 2 | frame 2 | ...
+#
+# Each field but frames is a single byte. A super-frame is delimited in a stream like a packet of any other channel.
+
+# Channel id of super-frames, cannot be used by a channel
+AGGREGATE_CHANNEL_ID = 255
+# Longest frame that can be aggregated, its length is stored in a single byte
+MAX_AGGREGATED_FRAME_SIZE = 255
+MAX_AGGREGATED_FRAMES = 255
+
+
+def aggregate_size(frames_size, count):
+    """
+    Size of a super-frame of count frames of frames_size bytes in total.
+    """
+    return 2 + count + frames_size
+
+
+def pack_frames(frames):
+    super_frame = bytearray(aggregate_size(sum(len(frame) for frame in frames), len(frames)))
+    super_frame[0] = AGGREGATE_CHANNEL_ID
+    super_frame[1] = len(frames)
+
+    position = 2
+
+    for frame in frames:
+        super_frame[position] = len(frame)
+        super_frame[position + 1:position + 1 + len(frame)] = frame
+        position += 1 + len(frame)
+
+    return super_frame
+
+
+def aggregate_length(buffer, offset):
+    """
+    Length of super-frame content starting at offset (after channel id), None if buffer does not hold all of it.
+    """
+    if offset >= len(buffer):
+        return None
+
+    position = offset + 1
+
+    for _ in range(buffer[offset]):
+        if position >= len(buffer):
+            return None
+
+        position += 1 + buffer[position]
+
+    return (position - offset) if position <= len(buffer) else None
+
+
+def unpack_frames(content):
+    """
+    Split super-frame content (after channel id) into a list of (channel id, packet bytes) tuples.
+    """
+    frames = []
+    position = 1
+
+    for _ in range(content[0]):
+        length = content[position]
+        frame = content[position + 1:position + 1 + length]
+
+        if len(frame) < length or not frame:
+            break
+
+        frames.append((frame[0], bytes(frame[1:])))
+        position += 1 + length
+
+    return frames
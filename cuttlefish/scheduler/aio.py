@@ -0,0 +1,128 @@
+from .errors import *
+from .scheduler import (
+    Scheduler,
+    ASYNCHRONOUS_SIMPLE,
+    SLOTTED,
+    SYNCHRONOUS,
+    IMPLICIT_SYNCHRONOUS,
+    IMPLICIT_SYNCHRONOUS_GATEWAY,
+)
+
+
+class AsyncScheduler(Scheduler):
+    """
+    Scheduler running on an asyncio event loop instead of threads and timers, so that a single thread can serve many
+    channels (eg. device sessions of a gateway).
+
+    start, called from a coroutine, starts uplink of channels in ASYNCHRONOUS_SIMPLE mode as tasks of the running
+    loop and receives from the socket as soon as it becomes readable (loop.add_reader). Where the loop cannot watch
+    the socket (eg. on MicroPython), downlink is run as a task every poll_interval seconds instead. Channels in
+    synchronous modes transmit on send as with Scheduler, channels in slotted mode run on the shared timer service;
+    start raises UndefinedMode for any other mode.
+
+    Received packets can be awaited with Channel.areceive or iterated over with async for. Keyword arguments other
+    than poll_interval are passed to Scheduler (eg. mtu, duty_cycle, priority_uplink).
+    """
+
+    def __init__(self, orchestrator, poll_interval=0.1, **kwargs):
+        super().__init__(orchestrator, **kwargs)
+
+        self.poll_interval = poll_interval
+
+        self.loop = None
+        self.tasks = []
+        self.reading = False
+
+    def start(self):
+        if not self.socket:
+            raise UndefinedConnectionParameters(
+                "Connection not initialized by channel"
+            )
+
+        if not self.channels:
+            raise UndefinedChannel(
+                "Connection not initialized by channel"
+            )
+
+        # Imported on use, so that asyncio is not loaded by thread-only applications
+        from cuttlefish.channel.aio import asyncio
+
+        for channel in self.channels.values():
+            mode = channel.get("mode")
+
+            if (mode not in ASYNC_MODES) and (mode not in TIMER_MODES) and (mode not in SYNCHRONOUS_MODES):
+                raise UndefinedMode("AsyncScheduler: mode {} cannot be run on an event loop".format(mode))
+
+        self.loop = asyncio.get_event_loop()
+        downlink_kwargs = None
+
+        for channel_id, channel in self.channels.items():
+            mode = channel.get("mode")
+            mode_kwargs = channel.get("mode_kwargs")
+            downlink_kwargs = mode_kwargs if downlink_kwargs is None else downlink_kwargs
+
+            if mode in ASYNC_MODES:
+                self.tasks.append(self.loop.create_task(ASYNC_MODES[mode](self, channel_id, **mode_kwargs)))
+            elif mode in TIMER_MODES:
+                channel["cancel_flag"] = mode(*channel.get("mode_args"), **mode_kwargs)
+
+        self.reading = self.watch_socket(downlink_kwargs)
+
+        if not self.reading:
+            self.tasks.append(self.loop.create_task(poll_downlink(self, downlink_kwargs)))
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+
+        self.tasks = []
+
+        for channel in self.channels.values():
+            if channel.get("mode") in TIMER_MODES and channel.get("cancel_flag"):
+                channel.pop("cancel_flag").cancel()
+
+        if self.reading:
+            self.loop.remove_reader(self.socket)
+            self.reading = False
+
+    def watch_socket(self, kwargs):
+        try:
+            self.loop.add_reader(self.socket, self.downlink, (self, kwargs))
+        except (AttributeError, NotImplementedError, ValueError, OSError):
+            return False
+
+        return True
+
+
+async def asynchronous_task(
+    scheduler, channel_id, uplink_interval=2, downlink_interval=2, uplink_downlink_interval=1, **kwargs
+):
+    """
+    Asynchronous schedule as a task: send a packet every uplink_interval seconds. Packets are received by the
+    scheduler whenever they arrive, so downlink intervals do not apply.
+    """
+    from cuttlefish.channel.aio import asyncio
+
+    arg = (scheduler, channel_id, kwargs)
+
+    while True:
+        await asyncio.sleep(uplink_interval)
+        scheduler.uplink(arg)
+
+
+async def poll_downlink(scheduler, kwargs):
+    from cuttlefish.channel.aio import asyncio
+
+    arg = (scheduler, kwargs)
+
+    while True:
+        scheduler.downlink(arg)
+        await asyncio.sleep(scheduler.poll_interval)
+
+
+# Modes run as tasks by AsyncScheduler
+ASYNC_MODES = {ASYNCHRONOUS_SIMPLE: asynchronous_task}
+# Modes run on the shared timer service, started as by Scheduler
+TIMER_MODES = (SLOTTED,)
+# Modes transmitting and receiving when channel sends and receives, nothing to start
+SYNCHRONOUS_MODES = (SYNCHRONOUS, IMPLICIT_SYNCHRONOUS, IMPLICIT_SYNCHRONOUS_GATEWAY)
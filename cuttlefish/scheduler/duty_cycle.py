@@ -0,0 +1,183 @@
+from .errors import AirtimeExceeded
+from cuttlefish.ring_buffer import ticks_ms, ticks_diff
+
+import _thread
+
+
+# EU868 sub-bands (ETSI EN 300 220): name: (lowest frequency [Hz], highest frequency [Hz], duty cycle)
+EU868_SUB_BANDS = {
+    "g": (863000000, 868000000, 0.01),
+    "g1": (868000000, 868600000, 0.01),
+    "g2": (868700000, 869200000, 0.001),
+    "g3": (869400000, 869650000, 0.1),
+    "g4": (869700000, 870000000, 0.01),
+}
+
+
+def time_on_air(
+    payload_size,
+    spreading_factor=7,
+    bandwidth=125000,
+    coding_rate=1,
+    preamble_length=8,
+    explicit_header=True,
+    crc=True,
+    low_data_rate_optimize=None,
+):
+    """
+    Time on air of a LoRa packet of payload_size bytes [s]. coding_rate is 1 to 4 for 4/5 to 4/8; low data rate
+    optimization is assumed on when symbols are longer than 16 ms (eg. SF11 and SF12 at 125 kHz) unless set.
+    """
+    symbol_time = (2 ** spreading_factor) / bandwidth
+
+    if low_data_rate_optimize is None:
+        low_data_rate_optimize = symbol_time > 0.016
+
+    numerator = 8 * payload_size - 4 * spreading_factor + 28 + (16 if crc else 0) - (0 if explicit_header else 20)
+    denominator = 4 * (spreading_factor - (2 if low_data_rate_optimize else 0))
+
+    # Ceiling of the division, without floats
+    payload_symbols = 8 + max(-(-numerator // denominator) * (coding_rate + 4), 0)
+
+    return (preamble_length + 4.25 + payload_symbols) * symbol_time
+
+
+def find_sub_band(frequency, sub_bands=EU868_SUB_BANDS):
+    for name, (lowest, highest, _) in sub_bands.items():
+        if lowest <= frequency <= highest:
+            return name
+
+    return None
+
+
+class TokenBucket:
+    """
+    Bucket of capacity tokens refilled at rate tokens per second.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_ticks = ticks_ms()
+
+    def refill(self):
+        ticks = ticks_ms()
+        self.tokens = min(self.tokens + self.rate * ticks_diff(ticks, self.last_ticks) / 1000, self.capacity)
+        self.last_ticks = ticks
+
+        return self.tokens
+
+    def consume(self, tokens):
+        if self.refill() < tokens:
+            return False
+
+        self.tokens -= tokens
+
+        return True
+
+    def wait_time(self, tokens):
+        """
+        Seconds until tokens are available, None if they exceed capacity and never will be.
+        """
+        if tokens > self.capacity:
+            return None
+
+        return max(tokens - self.refill(), 0) / self.rate
+
+
+class AirtimeAccountant:
+    """
+    AirtimeAccountant keeps transmissions within duty cycle limits of sub-bands. Every sub-band has a token bucket of
+    airtime: it holds duty cycle * window seconds and refills at duty cycle seconds per second, so that a node never
+    transmits more than the duty cycle over any window, while being allowed to burst after being quiet.
+
+    Time on air is computed from packet size and radio parameters (see time_on_air). acquire takes airtime of a
+    packet from the bucket of a sub-band, or refuses it if the budget would be exceeded; the scheduler then defers the
+    packet. A packet whose airtime exceeds the whole budget of a sub-band raises AirtimeExceeded and is dropped by the
+    scheduler. Remaining budget is exposed by remaining and budgets; stats count transmissions and airtime allowed,
+    deferred packets and oversized ones.
+
+        accountant = AirtimeAccountant(spreading_factor=9, sub_band="g1")
+        scheduler = Scheduler(orchestrator, duty_cycle=accountant)
+
+    Channels use sub_band unless they set their own with the sub_band connection parameter.
+    """
+
+    def __init__(
+        self,
+        sub_bands=EU868_SUB_BANDS,
+        sub_band="g1",
+        window=3600,
+        spreading_factor=7,
+        bandwidth=125000,
+        coding_rate=1,
+        preamble_length=8,
+    ):
+        self.sub_band = sub_band
+        self.window = window
+        self.radio = {
+            "spreading_factor": spreading_factor,
+            "bandwidth": bandwidth,
+            "coding_rate": coding_rate,
+            "preamble_length": preamble_length,
+        }
+
+        self.buckets = dict(
+            (name, TokenBucket(duty_cycle, duty_cycle * window)) for name, (_, _, duty_cycle) in sub_bands.items()
+        )
+        self.lock = _thread.allocate_lock()
+
+        self.stats = {"transmissions": 0, "airtime": 0, "deferred": 0, "oversized": 0}
+
+    def airtime(self, size):
+        return time_on_air(size, **self.radio)
+
+    def acquire(self, size, sub_band=None):
+        """
+        Take airtime of a packet of size bytes from budget of sub_band. Returns False if it would exceed the budget,
+        raises AirtimeExceeded if the packet does not fit in the budget even when it is full.
+        """
+        airtime = self.airtime(size)
+        sub_band = sub_band if sub_band else self.sub_band
+
+        with self.lock:
+            bucket = self.buckets[sub_band]
+
+            if airtime > bucket.capacity:
+                self.stats["oversized"] += 1
+                raise AirtimeExceeded(
+                    "Packet of {} bytes takes {} s on air, more than budget of sub-band {}.".format(
+                        size, airtime, sub_band
+                    )
+                )
+
+            if not bucket.consume(airtime):
+                self.stats["deferred"] += 1
+                return False
+
+            self.stats["transmissions"] += 1
+            self.stats["airtime"] += airtime
+
+        return True
+
+    def wait_time(self, size, sub_band=None):
+        """
+        Seconds until a packet of size bytes can be sent in sub_band, None if it never can.
+        """
+        with self.lock:
+            return self.buckets[sub_band if sub_band else self.sub_band].wait_time(self.airtime(size))
+
+    def remaining(self, sub_band=None):
+        """
+        Remaining airtime budget of sub_band [s].
+        """
+        with self.lock:
+            return self.buckets[sub_band if sub_band else self.sub_band].refill()
+
+    def budgets(self):
+        """
+        Remaining airtime budget of every sub-band [s], as a dictionary.
+        """
+        with self.lock:
+            return dict((name, bucket.refill()) for name, bucket in self.buckets.items())
@@ -34,3 +34,43 @@ class PacketsToBeScheduledDropped(Exception):
     """
     Issued when scheduler packet buffer is full
     """
+
+
+class SlotNotAllowed(Exception):
+    """
+    Raised when slot of slotted schedule is outside of superframe or guard times leave no time to transmit
+    """
+
+    pass
+
+
+class ChannelIdReserved(Exception):
+    """
+    Raised when a channel is connected with a channel id reserved by scheduler (eg. for super-frames)
+    """
+
+    pass
+
+
+class AirtimeExceeded(Exception):
+    """
+    Raised when time on air of a packet exceeds the whole airtime budget of its sub-band, so it can never be sent
+    """
+
+    pass
+
+
+class AgingIntervalNotAllowed(Exception):
+    """
+    Raised when aging interval of uplink dispatcher is not positive
+    """
+
+    pass
+
+
+class TimerIntervalNotAllowed(Exception):
+    """
+    Raised when a periodic timer is scheduled with an interval that is not positive
+    """
+
+    pass
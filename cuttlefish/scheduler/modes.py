@@ -1,9 +1,12 @@
+from .errors import SlotNotAllowed
+from .timer import get_timer_service
+
 import time
 
 try:
     from machine import Timer
-except Exception:
-    pass
+except ImportError:
+    from adapter import Timer
 
 
 def asynchronous_schedule(
@@ -12,6 +15,11 @@ def asynchronous_schedule(
     uplink_alarm = Timer.Alarm(
         scheduler.uplink, uplink_interval, periodic=True, arg=(scheduler, channel_id, kwargs)
     )
+
+    # Sockets registered with a reactor are received from as soon as data arrives
+    if scheduler.reactor:
+        return uplink_alarm, None
+
     time.sleep(uplink_downlink_interval)
     downlink_alarm = Timer.Alarm(
         scheduler.downlink, downlink_interval, periodic=True, arg=(scheduler, kwargs)
@@ -29,7 +37,7 @@ def synchronous_schedule(scheduler, channel_id, **kwargs):
         return scheduler.uplink((scheduler, channel_id, kwargs))
 
     def initiate_receive():
-        return scheduler.downlink((scheduler, kwargs))
+        return scheduler.downlink((scheduler, kwargs, channel_id))
 
     return initiate_transmission, initiate_receive
 
@@ -46,11 +54,11 @@ def implicitly_synchronous_schedule(scheduler, channel_id, receive_delay=0.00002
         timer = Timer.Chrono()
         timer.start()
 
-        result = recv_window(timer, rx1, scheduler.downlink, (scheduler, kwargs))
+        result = recv_window(timer, rx1, scheduler.downlink, (scheduler, kwargs, channel_id))
 
         if not result:
             timer.reset()
-            recv_window(timer, rx2, scheduler.downlink, (scheduler, kwargs))
+            recv_window(timer, rx2, scheduler.downlink, (scheduler, kwargs, channel_id))
 
         timer.stop()
 
@@ -77,6 +85,76 @@ def implicitly_synchronous_schedule_gateway(scheduler, channel_id, **kwargs):
         scheduler.uplink((scheduler, channel_id, kwargs))
 
     def initiate_gateway_recv_mode():
-        scheduler.downlink((scheduler, kwargs))
+        scheduler.downlink((scheduler, kwargs, channel_id))
 
     return initiate_gateway_send_mode, initiate_gateway_recv_mode
+
+
+def slotted_schedule(
+    scheduler,
+    channel_id,
+    slots=8,
+    slot_length=1,
+    guard_time=0.05,
+    slot=None,
+    packets_per_slot=1,
+    listen_interval=0.01,
+    clock=time.time,
+    **kwargs
+):
+    """
+    Slotted (TDMA) schedule: time is divided into superframes of slots slots, slot_length seconds each. Node transmits
+    up to packets_per_slot packets in its own slot only, slot_index of its address unless slot is set, so that nodes
+    of a network with no more nodes than slots never collide. Transmission starts guard_time seconds into the slot,
+    which absorbs clock offsets between nodes.
+
+    In the other slots node receives: socket registered with a reactor is received from as soon as packets arrive,
+    otherwise node listens until the slot ends, running downlink every listen_interval seconds. Listening is driven
+    by the timer service as well, so it does not hold up timers of other channels.
+
+    Superframes start at multiples of slots * slot_length seconds of clock, which has to be synchronized between
+    nodes (eg. by RTC). Slots are driven by the shared timer service; returns the timer handle.
+    """
+    if slot is None:
+        slot = slot_index(scheduler.orchestrator.channels[channel_id].network.address, slots)
+
+    if not (0 <= slot < slots):
+        raise SlotNotAllowed("Slot {} is outside of superframe of {} slots.".format(slot, slots))
+
+    if (2 * guard_time) >= slot_length:
+        raise SlotNotAllowed("Guard time of {} s leaves no time to transmit in slot.".format(guard_time))
+
+    superframe = slots * slot_length
+    uplink_arg = (scheduler, channel_id, kwargs)
+    downlink_arg = (scheduler, kwargs, channel_id)
+
+    def slot_start():
+        # Timer fires guard time after slot boundary, so slot is found correctly for small drift of either clock
+        current_slot = int((clock() % superframe) // slot_length)
+
+        if current_slot == slot:
+            for _ in range(packets_per_slot):
+                if not scheduler.uplink(uplink_arg):
+                    break
+
+        elif not scheduler.reactor:
+            listen(clock() - (clock() % slot_length) + slot_length - guard_time)
+
+    def listen(slot_end):
+        scheduler.downlink(downlink_arg)
+
+        remaining = slot_end - clock()
+
+        if remaining > 0:
+            get_timer_service().schedule(min(listen_interval, remaining), listen, slot_end)
+
+    delay = slot_length - (clock() % slot_length) + guard_time
+
+    return get_timer_service().schedule(delay, slot_start, periodic=True, interval=slot_length)
+
+
+def slot_index(address, slots):
+    """
+    Slot of node in superframe, derived from its address. Consecutive addresses get consecutive slots.
+    """
+    return int.from_bytes(address, "big") % slots
@@ -0,0 +1,90 @@
+from .errors import AgingIntervalNotAllowed
+from cuttlefish.ring_buffer import ticks_ms, ticks_diff
+
+
+# Priority classes of channels, lower is sent first
+CONTROL = 0
+ACK = 1
+BULK = 2
+
+
+class UplinkDispatcher:
+    """
+    UplinkDispatcher decides which channel of a scheduler transmits next, so that a single uplink (eg. one timer)
+    serves all channels. Every channel has a priority class, set by the priority connection parameter (BULK by
+    default); a channel with acknowledgments queued counts as ACK class at least, so that acknowledgments and control
+    traffic go before bulk telemetry.
+
+    To prevent starvation, a channel is promoted by one class for every aging_interval seconds it has been waiting
+    with packets queued since it last transmitted. Channels of the same effective class are served oldest first.
+    """
+
+    def __init__(self, scheduler, aging_interval=1):
+        if aging_interval <= 0:
+            raise AgingIntervalNotAllowed("Aging interval must be positive, got {}.".format(aging_interval))
+
+        self.scheduler = scheduler
+        # Kept as a float, intervals shorter than a millisecond tick would truncate to 0
+        self.aging_interval = aging_interval * 1000
+
+        # Time since when channels with packets queued have been waiting [ms ticks], by channel id
+        self.waiting_since = {}
+        # Channels ranked above their class by the last ranking
+        self.promoted = set()
+        # Number of transmissions before the last one of channel, orders channels waiting for equally long
+        self.last_served = {}
+        self.served_count = 0
+
+        self.stats = {"dispatched": 0, "promoted": 0}
+
+    def rank(self):
+        """
+        Return ids of channels with packets queued, in order they should transmit.
+        """
+        scheduler = self.scheduler
+        now = ticks_ms()
+        ranked = []
+        promoted = set()
+
+        for channel_id, channel in scheduler.channels.items():
+            queued, urgent = scheduler.queued(channel_id)
+
+            if not queued:
+                self.waiting_since.pop(channel_id, None)
+                continue
+
+            since = self.waiting_since.get(channel_id)
+
+            if since is None:
+                since = self.waiting_since[channel_id] = now
+
+            priority_class = channel["mode_kwargs"].get("priority", BULK)
+
+            if urgent:
+                priority_class = min(priority_class, ACK)
+
+            age = ticks_diff(now, since)
+            effective_class = priority_class - int(age // self.aging_interval)
+
+            if effective_class < priority_class:
+                promoted.add(channel_id)
+
+            ranked.append((effective_class, -age, self.last_served.get(channel_id, 0), channel_id))
+
+        ranked.sort()
+        self.promoted = promoted
+
+        return [ranking[-1] for ranking in ranked]
+
+    def served(self, channel_id):
+        """
+        Record a transmission of channel, which starts its waiting anew.
+        """
+        self.waiting_since[channel_id] = ticks_ms()
+
+        self.served_count += 1
+        self.last_served[channel_id] = self.served_count
+        self.stats["dispatched"] += 1
+
+        if channel_id in self.promoted:
+            self.stats["promoted"] += 1
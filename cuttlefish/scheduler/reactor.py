@@ -0,0 +1,191 @@
+import _thread
+import time
+
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+try:
+    import select
+except ImportError:
+    import uselect as select
+
+
+class Reactor:
+    """
+    Reactor receives packets of all registered schedulers on a single thread. It waits until a socket becomes
+    readable and runs downlink of the scheduler owning it, which submits received packets to the orchestrator with
+    submit_received_bytes. Unlike polling recv in a loop, the thread takes no CPU while no data arrives and handles
+    data as soon as it does.
+
+    Sockets are waited on with selectors (select.poll where selectors is not available, eg. on MicroPython), so they
+    have to support it (implement fileno on CPython). Sockets registered while the reactor is running are waited on
+    from the next wake-up at the latest, poll_interval seconds after the previous one; the same bounds how long stop
+    takes.
+
+    Scheduler registers its socket when connection parameters are set, if created with a reactor:
+
+        reactor = Reactor()
+        scheduler = Scheduler(orchestrator, reactor=reactor)
+        ...
+        reactor.start()
+    """
+
+    def __init__(self, poll_interval=0.1):
+        self.poll_interval = poll_interval
+
+        self.selector = selectors.DefaultSelector() if selectors else None
+        self.poller = select.poll() if not self.selector else None
+        # Handlers of poller, by file descriptor (or socket on MicroPython, where poll returns sockets)
+        self.handlers = {}
+
+        self.active = False
+        self.stopped_lock = _thread.allocate_lock()
+
+        self.stats = {"wakeups": 0, "dispatched": 0, "errors": 0}
+
+    def register(self, socket, scheduler, **kwargs):
+        """
+        Run downlink of scheduler with kwargs (eg. buffer_size, recv_callback) whenever socket becomes readable.
+        """
+        handler = (scheduler, kwargs)
+
+        if self.selector:
+            self.selector.register(socket, selectors.EVENT_READ, handler)
+        else:
+            self.poller.register(socket, select.POLLIN)
+            self.handlers[poll_key(socket)] = handler
+
+    def unregister(self, socket):
+        if self.selector:
+            self.selector.unregister(socket)
+        else:
+            self.poller.unregister(socket)
+            self.handlers.pop(poll_key(socket), None)
+
+    def is_registered(self, socket):
+        if self.selector:
+            try:
+                self.selector.get_key(socket)
+            except KeyError:
+                return False
+
+            return True
+
+        return poll_key(socket) in self.handlers
+
+    def start(self):
+        self.active = True
+        self.stopped_lock.acquire()
+
+        _thread.start_new_thread(self.run, ())
+
+    def stop(self, timeout=None):
+        """
+        Stop the reactor thread. Returns False if it did not stop within timeout seconds.
+        """
+        if not self.active:
+            return True
+
+        self.active = False
+
+        if timeout is None:
+            stopped = self.stopped_lock.acquire()
+        else:
+            stopped = self.stopped_lock.acquire(1, timeout)
+
+        if stopped:
+            self.stopped_lock.release()
+
+        return stopped
+
+    def run(self):
+        try:
+            while self.active:
+                self.run_once(self.poll_interval)
+        finally:
+            self.stopped_lock.release()
+
+    def run_once(self, timeout=None):
+        """
+        Wait up to timeout seconds (None waits indefinitely) for registered sockets to become readable and run their
+        downlink. Returns number of sockets handled.
+        """
+        handlers = self.poll(timeout)
+
+        if handlers:
+            self.stats["wakeups"] += 1
+
+        for scheduler, kwargs in handlers:
+            try:
+                scheduler.downlink((scheduler, kwargs))
+                self.stats["dispatched"] += 1
+            except Exception:
+                self.stats["errors"] += 1
+
+        return len(handlers)
+
+    def poll(self, timeout):
+        if self.selector:
+            if not self.selector.get_map():
+                # Nothing to wait on, some selectors fail on an empty set
+                if timeout:
+                    time.sleep(timeout)
+
+                return []
+
+            return [key.data for key, events in self.selector.select(timeout)]
+
+        handlers = []
+
+        for event in self.poller.poll(poll_timeout(timeout)):
+            handler = self.handlers.get(poll_key(event[0]))
+
+            if handler:
+                handlers.append(handler)
+
+        return handlers
+
+
+def wait_readable(socket, timeout=None):
+    """
+    Wait up to timeout seconds (None waits indefinitely) for socket to become readable. Returns True if it is.
+    """
+    poller = select.poll()
+    poller.register(socket, select.POLLIN)
+
+    return bool(poller.poll(poll_timeout(timeout)))
+
+
+def listen(scheduler, downlink_arg):
+    """
+    Run downlink of scheduler whenever its socket becomes readable, indefinitely.
+    """
+    while True:
+        wait_readable(scheduler.socket)
+        scheduler.downlink(downlink_arg)
+
+
+def start_listening(scheduler, downlink_arg):
+    """
+    Start a thread receiving from socket of scheduler (see listen), unless the socket is registered with a reactor
+    which receives from it already. Returns the thread, None if not started.
+    """
+    if scheduler.reactor:
+        return None
+
+    return _thread.start_new_thread(listen, (scheduler, downlink_arg))
+
+
+def poll_timeout(timeout):
+    # Timeout of poll is in milliseconds, negative waits indefinitely
+    return -1 if timeout is None else max(int(timeout * 1000), 0)
+
+
+def poll_key(socket):
+    try:
+        return socket.fileno()
+    except AttributeError:
+        return socket
+
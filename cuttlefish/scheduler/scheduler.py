@@ -1,18 +1,32 @@
 from .errors import *
 from .modes import *
+from .stream import FrameStream
+from .aggregation import *
+from .priority import UplinkDispatcher
+from .timer import get_timer_service
+
+import _thread
 
 try:
-    from adapter.sim_modes import implicitly_synchronous_schedule_sim
+    from adapter.sim_modes import implicitly_synchronous_schedule_sim, asynchronous_schedule_sim
 except:
     implicitly_synchronous_schedule_sim = None
+    asynchronous_schedule_sim = None
 
 
-ASYNCHRONOUS_SIMPLE = asynchronous_schedule
+ASYNCHRONOUS_SIMPLE = asynchronous_schedule_sim if asynchronous_schedule_sim else asynchronous_schedule
 IMPLICIT_SYNCHRONOUS = implicitly_synchronous_schedule_sim if implicitly_synchronous_schedule_sim else implicitly_synchronous_schedule
 IMPLICIT_SYNCHRONOUS_GATEWAY = implicitly_synchronous_schedule_gateway
 SYNCHRONOUS = synchronous_schedule
+SLOTTED = slotted_schedule
 FLOODING = None
 
+# Longest datagram read in datagram mode unless mtu is set, LoRa payloads are at most 255 bytes
+MAX_DATAGRAM_SIZE = 255
+
+# Size of receive demultiplexing table, one entry for every value of a channel id byte
+DEMUX_SIZE = 256
+
 
 class Scheduler:
     """
@@ -37,10 +51,47 @@ class Scheduler:
     Implicitly synchronous
 
     Slotted
-
+    Time is divided into superframes of slots; every node transmits only in its own slot, derived from its address,
+    and receives in the others (see slotted_schedule). Like asynchronous mode, it is started by start.
+
+    Received bytes are a stream by default: a frame left incomplete by a read is completed by the next one. If
+    datagrams is set (eg. for a LoRa socket returning one packet per read), every read is taken as a whole datagram
+    of up to mtu (MAX_DATAGRAM_SIZE by default) bytes, and a frame it leaves incomplete is dropped rather than
+    completed with bytes of the next packet.
+
+    If a reactor is supplied, the socket is registered with it once connection parameters are set, so that downlink
+    runs whenever data arrives instead of being polled.
+
+    If mtu is set, uplink packs frames queued by its channel, followed by frames of the other channels, into a single
+    super-frame of up to mtu bytes (see aggregation), so that the per-transmission overhead is paid once for all of
+    them. Received super-frames are split by downlink regardless.
+
+    Received packets are demultiplexed by a table of 256 handlers indexed by channel id: channels connected to the
+    scheduler queue packets straight to their task queue, any other id (unknown, disconnected or reserved) is dropped
+    at the receive edge and counted in rejected, so that it never reaches the director.
+
+    If duty_cycle (an AirtimeAccountant) is set, uplink sends a packet only if its time on air fits in the remaining
+    budget of the channel's sub-band (sub_band connection parameter). Otherwise the packet is deferred: uplink returns
+    False and the packet is the first one sent by a later uplink of the channel, while channels of other sub-bands go
+    on transmitting. Channels in synchronous mode, which have no uplink of their own, retry once the budget allows.
+    A packet too long to ever fit in the budget is dropped (see AirtimeAccountant).
+
+    If priority_uplink is set, uplink of any channel transmits the packet of whichever channel should go first (see
+    UplinkDispatcher), so that a single timer or mode can serve all channels: channels are ranked by priority class
+    (priority connection parameter: CONTROL, ACK or BULK) and by how long they have been waiting, aging_interval
+    seconds of waiting promoting a channel by one class.
     """
 
-    def __init__(self, orchestrator):
+    def __init__(
+        self,
+        orchestrator,
+        reactor=None,
+        mtu=None,
+        duty_cycle=None,
+        priority_uplink=False,
+        aging_interval=1,
+        datagrams=False,
+    ):
         # TODO: optimal default buffer size
         self.orchestrator = orchestrator
         self.channels = {}
@@ -49,6 +100,31 @@ class Scheduler:
         self.downlink = None
 
         self.socket = None
+        self.stream = FrameStream(self.frame_length)
+        # Every read returns a whole datagram, frames are not continued by the next read
+        self.datagrams = datagrams
+        # Downlink may be run by the reactor and a channel's receive at once, stream takes one chunk at a time
+        self.receive_lock = _thread.allocate_lock()
+
+        self.reactor = reactor
+
+        self.mtu = mtu
+        # Frames taken from send buffers which did not fit in the last super-frame, by channel id
+        self.held = {}
+        self.aggregate_lock = _thread.allocate_lock()
+
+        self.duty_cycle = duty_cycle
+        # Packets not sent for lack of airtime budget, by channel id
+        self.deferred = {}
+        # Timers retrying deferred packets of synchronous channels, by channel id
+        self.retries = {}
+
+        self.dispatcher = UplinkDispatcher(self, aging_interval) if priority_uplink else None
+
+        # Receive handler by channel id, packets of channels not connected are rejected
+        self.demux = [self.reject] * DEMUX_SIZE
+        # Rejected packets, by channel id
+        self.rejected = {}
 
     def set_connection_parameters(
         self,
@@ -65,6 +141,9 @@ class Scheduler:
         if (not mode) and (not schedule_callback):
             raise UndefinedSchedulerBehaviour
 
+        if channel_id == AGGREGATE_CHANNEL_ID:
+            raise ChannelIdReserved("Channel id {} is reserved for super-frames.".format(channel_id))
+
         self.socket = socket
 
         mode = schedule_callback if schedule_callback else mode
@@ -79,9 +158,14 @@ class Scheduler:
                                             }
                               })
 
+        self.demux[channel_id] = self.accept
+
         self.uplink = uplink_callback if uplink_callback else uplink
         self.downlink = downlink_callback if downlink_callback else downlink
 
+        if self.reactor and not self.reactor.is_registered(socket):
+            self.reactor.register(socket, self, **kwargs)
+
         if (mode == IMPLICIT_SYNCHRONOUS) or (mode == IMPLICIT_SYNCHRONOUS_GATEWAY) or (mode == SYNCHRONOUS):
             return mode(*mode_args, **mode_kwargs)
 
@@ -101,7 +185,7 @@ class Scheduler:
         for channel in self.channels.values():
             callback = resolve_callback(channel.get("mode"))
 
-            if callback != ASYNCHRONOUS_SIMPLE:
+            if (callback != ASYNCHRONOUS_SIMPLE) and (callback != SLOTTED):
                 continue
 
             mode_args = channel.get("mode_args")
@@ -112,8 +196,143 @@ class Scheduler:
     def get_packet(self, channel_id):
         return self.orchestrator.get_packet(channel_id)
 
+    def queued(self, channel_id):
+        """
+        Return number of packets waiting to be sent through channel and number of those that are urgent.
+        """
+        queued, urgent = self.orchestrator.queued(channel_id)
+
+        return queued + (channel_id in self.held) + (channel_id in self.deferred), urgent
+
+    def next_transmission(self, channel_id, sub_band=None):
+        """
+        Return data to be sent by uplink of channel, None if nothing is queued or airtime budget of sub_band does not
+        allow sending it yet.
+        """
+        while True:
+            data = self.deferred.pop(channel_id, None)
+
+            if data is None:
+                data = self.aggregate(channel_id) if self.mtu else self.get_packet(channel_id)
+
+            if (data is None) or (not self.duty_cycle):
+                return data
+
+            try:
+                if self.duty_cycle.acquire(len(data), sub_band):
+                    return data
+            except AirtimeExceeded:
+                # Packet can never be sent within the budget, it is dropped and counted by duty_cycle
+                continue
+
+            # Frames of a ByteRing are only valid until the next one is taken
+            self.deferred[channel_id] = bytes(data)
+            self.schedule_retry(channel_id, len(data), sub_band)
+
+            return None
+
+    def schedule_retry(self, channel_id, size, sub_band):
+        """
+        Run uplink of a synchronous channel once airtime budget allows sending its deferred packet.
+        """
+        channel = self.channels.get(channel_id)
+
+        if (not channel) or (channel["mode"] != SYNCHRONOUS) or (channel_id in self.retries):
+            return
+
+        self.retries[channel_id] = get_timer_service().schedule(
+            self.duty_cycle.wait_time(size, sub_band), self.retry, channel_id
+        )
+
+    def retry(self, channel_id):
+        self.retries.pop(channel_id, None)
+        self.uplink((self, channel_id, self.channels[channel_id]["mode_kwargs"]))
+
+    def aggregate(self, channel_id):
+        """
+        Take frames of channel and then of other channels until the next one would not fit in mtu. Returns a
+        super-frame, or the frame alone if it is the only one (or too large to be aggregated).
+        """
+        with self.aggregate_lock:
+            return self.aggregate_locked(channel_id)
+
+    def aggregate_locked(self, channel_id):
+        frames = []
+        frames_size = 0
+
+        other_ids = self.dispatcher.rank() if self.dispatcher else self.channels
+
+        for queue_id in [channel_id] + [other_id for other_id in other_ids if other_id != channel_id]:
+            while len(frames) < MAX_AGGREGATED_FRAMES:
+                frame = self.held.pop(queue_id, None)
+
+                if frame is None:
+                    frame = self.get_packet(queue_id)
+
+                if frame is None:
+                    break
+
+                # Frames of a ByteRing are only valid until the next one is taken
+                frame = bytes(frame)
+
+                if (len(frame) > MAX_AGGREGATED_FRAME_SIZE) or (
+                    aggregate_size(frames_size + len(frame), len(frames) + 1) > self.mtu
+                ):
+                    if not frames:
+                        return frame
+
+                    self.held[queue_id] = frame
+
+                    return pack_frames(frames)
+
+                frames.append(frame)
+                frames_size += len(frame)
+
+        if len(frames) > 1:
+            return pack_frames(frames)
+
+        return frames[0] if frames else None
+
+    def frame_length(self, channel_id, buffer, offset):
+        if channel_id == AGGREGATE_CHANNEL_ID:
+            return aggregate_length(buffer, offset)
+
+        channels = self.orchestrator.channels
+
+        if (self.demux[channel_id] is self.reject) or (not channels) or (channel_id not in channels):
+            # Packet of a channel not connected cannot be delimited, stream drops the rest of the datagram (or of
+            # the bytes buffered)
+            self.reject(channel_id, None, None)
+            raise KeyError(channel_id)
+
+        return channels[channel_id].serializer.get_decoder().frame_length(buffer, offset)
+
     def submit_received_bytes(self, channel_id, packet_bytes, meta):
-        self.orchestrator.add_task(channel_id, 1, (packet_bytes, meta))
+        return self.demux[channel_id](channel_id, packet_bytes, meta)
+
+    def accept(self, channel_id, packet_bytes, meta):
+        """
+        Receive handler of a connected channel until its task queue is looked up, on its first packet.
+        """
+        handler = self.orchestrator.received_handler(channel_id)
+
+        if not handler:
+            return self.reject(channel_id, packet_bytes, meta)
+
+        self.demux[channel_id] = handler
+
+        return handler(channel_id, packet_bytes, meta)
+
+    def reject(self, channel_id, packet_bytes, meta):
+        self.rejected[channel_id] = self.rejected.get(channel_id, 0) + 1
+
+        return 0
+
+    def disconnect(self, channel_id):
+        """
+        Reject packets received for channel from now on.
+        """
+        self.demux[channel_id] = self.reject
 
 
 def uplink(args):
@@ -121,10 +340,23 @@ def uplink(args):
     channel_id = args[1]
     kwargs = args[2]
 
+    dispatcher = scheduler.dispatcher
+    # Any channel with packets queued may transmit, the first one ranked that has a packet ready
+    channel_ids = dispatcher.rank() if dispatcher else (channel_id,)
+    data = None
+
+    for channel_id in channel_ids:
+        if dispatcher:
+            kwargs = scheduler.channels[channel_id]["mode_kwargs"]
+
+        data = scheduler.next_transmission(channel_id, kwargs.get("sub_band"))
+
+        if data:
+            break
+
     sent_callback = kwargs.get("sent_callback")
     sent_args = tuple() if not kwargs.get("sent_args") else kwargs.get("sent_args")
 
-    data = scheduler.get_packet(channel_id)
     socket = scheduler.socket
 
     if data:
@@ -135,6 +367,9 @@ def uplink(args):
         if sent_callback:
             sent_callback(data, *sent_args)
 
+        if dispatcher:
+            dispatcher.served(channel_id)
+
         return True
 
     return False
@@ -143,40 +378,53 @@ def uplink(args):
 def downlink(args):
     scheduler = args[0]
     kwargs = args[1]
-    # TODO: Fix this
-    channel_id = kwargs
+    # Channel whose packets make downlink return True, any channel if not given (eg. by reactor)
+    channel_id = args[2] if len(args) > 2 else None
 
     buffer_size = kwargs.get("buffer_size") if kwargs.get("buffer_size") else 32
+    datagrams = scheduler.datagrams
+
+    if datagrams:
+        # A datagram longer than the read would be truncated
+        buffer_size = max(buffer_size, scheduler.mtu if scheduler.mtu else MAX_DATAGRAM_SIZE)
     recv_callback = kwargs.get("recv_callback")
     recv_args = tuple() if not kwargs.get("recv_args") else kwargs.get("recv_args")
 
-    data = b""
-    meta = {}
-    new_data = True
-
     socket = scheduler.socket
     socket.setblocking(False)
 
-    while new_data:
-        new_data = socket.recv(buffer_size)
-        meta.update({"time_recv": scheduler.orchestrator.rtc.now()})
+    received = False
 
-        if new_data:
-            data += new_data
+    with scheduler.receive_lock:
+        while True:
+            try:
+                new_data = socket.recv(buffer_size)
+            except OSError:
+                # Non-blocking socket with no data waiting (eg. on CPython)
+                break
 
-    if data:
-        received_channel_id = data[0]
-        scheduler.submit_received_bytes(received_channel_id, data[1:], meta)
+            if not new_data:
+                break
 
-        if recv_callback:
-            recv_callback(data, *recv_args)
+            time_recv = scheduler.orchestrator.rtc.now()
 
-        if received_channel_id == channel_id:
-            return True
+            # Dispatch every packet completed by the chunk, keep the rest for the next one unless it is a datagram
+            for stream_channel_id, stream_bytes in scheduler.stream.feed(new_data, datagram=datagrams):
+                if stream_channel_id == AGGREGATE_CHANNEL_ID:
+                    frames = unpack_frames(stream_bytes)
+                else:
+                    frames = ((stream_channel_id, stream_bytes),)
 
-        return False
+                for received_channel_id, packet_bytes in frames:
+                    scheduler.submit_received_bytes(received_channel_id, packet_bytes, {"time_recv": time_recv})
 
-    return False
+                    if recv_callback:
+                        recv_callback(received_channel_id.to_bytes(1, "big") + packet_bytes, *recv_args)
+
+                    if (channel_id is None) or (received_channel_id == channel_id):
+                        received = True
+
+    return received
 
 
 def resolve_callback(mode):
@@ -0,0 +1,75 @@
+class FrameStream:
+    """
+    FrameStream decodes frames incrementally from chunks of bytes read from a socket. Chunks may contain several
+    concatenated frames or only a part of one; every complete frame is returned as soon as the scheme of its channel
+    says it is complete, and bytes following it are kept as the start of the next frame.
+
+    A frame starts with the channel id, followed by packet bytes described by the channel's scheme. frame_length is a
+    callback(channel_id, buffer, offset) returning length of the packet starting at offset, or None if more bytes are
+    needed. If it raises KeyError (unknown channel), buffered bytes cannot be delimited and are dropped.
+
+    A chunk fed as a datagram (eg. read from a LoRa socket) is known to end on a frame boundary: bytes of a frame it
+    leaves incomplete are dropped, so that a truncated packet is never completed with bytes of the next one. Dropped
+    bytes are counted in dropped_bytes.
+    """
+
+    def __init__(self, frame_length, channel_id_size=1):
+        self.frame_length = frame_length
+        self.channel_id_size = channel_id_size
+
+        self.buffer = bytearray()
+        self.start = 0
+
+        self.dropped_bytes = 0
+
+    def feed(self, chunk, datagram=False):
+        """
+        Append a chunk to the stream. Returns a list of (channel id, packet bytes) tuples of frames completed by it.
+        If datagram is set, nothing of the chunk is kept for the next one.
+        """
+        buffer = self.buffer
+        buffer.extend(chunk)
+
+        frames = []
+        start = self.start
+        id_size = self.channel_id_size
+
+        while len(buffer) - start > id_size:
+            channel_id = int.from_bytes(buffer[start:start + id_size], "big")
+
+            try:
+                length = self.frame_length(channel_id, buffer, start + id_size)
+            except KeyError:
+                self.dropped_bytes += len(buffer) - start
+                start = len(buffer)
+                break
+
+            if length is None:
+                break
+
+            packet_start = start + id_size
+            frames.append((channel_id, bytes(buffer[packet_start:packet_start + length])))
+            start = packet_start + length
+
+        if datagram and start < len(buffer):
+            self.dropped_bytes += len(buffer) - start
+            start = len(buffer)
+
+        # Discard consumed bytes once they outweigh pending ones
+        if start >= len(buffer):
+            del buffer[:]
+            start = 0
+        elif start > (len(buffer) - start):
+            del buffer[:start]
+            start = 0
+
+        self.start = start
+
+        return frames
+
+    def pending(self):
+        return len(self.buffer) - self.start
+
+    def reset(self):
+        self.buffer = bytearray()
+        self.start = 0
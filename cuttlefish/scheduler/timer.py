@@ -0,0 +1,192 @@
+from .errors import TimerIntervalNotAllowed
+from cuttlefish.ring_buffer import Signal, ticks_us, ticks_diff
+
+import _thread
+
+try:
+    from heapq import heappush, heappop
+except ImportError:
+    from uheapq import heappush, heappop
+
+
+# Longest time timer thread sleeps at once [s], so that elapsed time is accounted before ticks wrap around
+MAX_SLEEP = 60
+
+
+class TimerHandle:
+    """
+    Timer scheduled by TimerService. Calling cancel stops it from firing (again, if periodic).
+    """
+
+    def __init__(self, service, deadline, interval, periodic, callback, args):
+        self.service = service
+        self.deadline = deadline
+        self.interval = interval
+        self.periodic = periodic
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.service.cancel(self)
+
+
+class TimerService:
+    """
+    TimerService runs callbacks of any number of timers on a single thread. Timers are kept in a heap ordered by
+    deadline; the thread sleeps until the earliest deadline, or until a timer with an earlier one is scheduled. A
+    cancelled timer is only marked and is dropped from the heap when its deadline comes.
+
+    Callbacks run on the timer thread one after another, so they are expected to be short (eg. queue a packet, start
+    a transmission). Exceptions raised by callbacks are counted in stats and do not stop the service. The thread is
+    started by the first scheduled timer.
+
+        timers = TimerService()
+        handle = timers.schedule(0.5, callback, arg)
+        timers.cancel(handle)
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.lock = _thread.allocate_lock()
+        self.signal = Signal()
+        # Timers scheduled with the same deadline fire in order of scheduling
+        self.sequence = 0
+
+        # Time elapsed since the service was created [us], never wraps around unlike ticks
+        self.elapsed = 0
+        self.last_ticks = ticks_us()
+
+        self.active = False
+        self.stopped_lock = _thread.allocate_lock()
+
+        self.stats = {"fired": 0, "cancelled": 0, "errors": 0}
+
+    def schedule(self, delay, callback, *args, periodic=False, interval=None):
+        """
+        Call callback with args once delay seconds pass, and every interval seconds (delay by default) after that if
+        periodic. Returns a TimerHandle.
+        """
+        delay = int(delay * 1000000)
+        interval = int(interval * 1000000) if interval is not None else delay
+
+        # A periodic timer firing again at once would keep the timer thread from serving others
+        if periodic and (interval <= 0):
+            raise TimerIntervalNotAllowed("Interval of a periodic timer must be positive.")
+
+        with self.lock:
+            handle = TimerHandle(self, self.now() + delay, interval, periodic, callback, args)
+            earliest = self.push(handle)
+
+        if not self.active:
+            self.start()
+        elif earliest:
+            self.signal.set()
+
+        return handle
+
+    def cancel(self, handle):
+        if not handle.cancelled:
+            handle.cancelled = True
+            self.stats["cancelled"] += 1
+
+    def start(self):
+        with self.lock:
+            if self.active:
+                return
+
+            self.active = True
+            self.stopped_lock.acquire()
+
+        _thread.start_new_thread(self.run, ())
+
+    def stop(self, timeout=None):
+        """
+        Stop the timer thread once the callback it is running returns. Timers left are not fired until started again.
+        Returns False if the thread did not stop within timeout seconds.
+        """
+        if not self.active:
+            return True
+
+        self.active = False
+        self.signal.set()
+
+        if timeout is None:
+            stopped = self.stopped_lock.acquire()
+        else:
+            stopped = self.stopped_lock.acquire(1, timeout)
+
+        if stopped:
+            self.stopped_lock.release()
+
+        return stopped
+
+    def run(self):
+        try:
+            while self.active:
+                self.signal.wait(self.run_pending())
+        finally:
+            self.stopped_lock.release()
+
+    def run_pending(self):
+        """
+        Fire all timers that are due. Returns seconds until the next deadline (at most MAX_SLEEP).
+        """
+        while self.active:
+            with self.lock:
+                now = self.now()
+
+                if not self.heap:
+                    return MAX_SLEEP
+
+                deadline, _, handle = self.heap[0]
+
+                if deadline > now:
+                    return min((deadline - now) / 1000000, MAX_SLEEP)
+
+                heappop(self.heap)
+
+                if handle.cancelled:
+                    continue
+
+                if handle.periodic:
+                    # Keep period regardless of how late the timer fired
+                    handle.deadline = max(deadline + handle.interval, now)
+                    self.push(handle)
+
+            self.stats["fired"] += 1
+
+            try:
+                handle.callback(*handle.args)
+            except Exception:
+                self.stats["errors"] += 1
+
+        return 0
+
+    def push(self, handle):
+        self.sequence += 1
+        heappush(self.heap, (handle.deadline, self.sequence, handle))
+
+        return self.heap[0][2] is handle
+
+    def now(self):
+        ticks = ticks_us()
+        self.elapsed += ticks_diff(ticks, self.last_ticks)
+        self.last_ticks = ticks
+
+        return self.elapsed
+
+
+# Timer service shared by schedules and simulated alarms, created on first use
+shared_timer_service = None
+shared_timer_lock = _thread.allocate_lock()
+
+
+def get_timer_service():
+    global shared_timer_service
+
+    with shared_timer_lock:
+        if shared_timer_service is None:
+            shared_timer_service = TimerService()
+
+    return shared_timer_service